@@ -21,10 +21,6 @@ import numpy as np
 import scipy
 import pickle
 
-from sklearn.linear_model import LogisticRegression
-from sklearn.pipeline import make_pipeline
-from sklearn.preprocessing import FunctionTransformer, StandardScaler
-
 
 # Define functions to prepare data for speaker dependent verifier model
 def get_reference_clip_features(
@@ -103,6 +99,11 @@ def train_verifier_model(features: np.ndarray, labels: np.ndarray):
     Returns:
         The trained scikit-learn logistic regression model
     """
+    # Import scikit-learn only when training, as it is slow to import and not needed for prediction
+    from sklearn.linear_model import LogisticRegression
+    from sklearn.pipeline import make_pipeline
+    from sklearn.preprocessing import FunctionTransformer, StandardScaler
+
     # C value matters alot here, depending on dataset size (larger datasets work better with larger C?)
     clf = LogisticRegression(random_state=0, max_iter=2000, C=0.001)
     pipeline = make_pipeline(FunctionTransformer(flatten_features), StandardScaler(), clf)
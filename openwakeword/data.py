@@ -21,7 +21,7 @@ from functools import partial
 from pathlib import Path
 import random
 from tqdm import tqdm
-from typing import List, Tuple
+from typing import List, Optional, Tuple
 import numpy as np
 import itertools
 import pronouncing
@@ -744,14 +744,18 @@ class mmap_batch_generator:
                  batch_size: int = 128,
                  n_per_class: dict = {},
                  data_transform_funcs: dict = {},
-                 label_transform_funcs: dict = {}
+                 label_transform_funcs: dict = {},
+                 n_frames: Optional[int] = None
                  ):
         """
         Initialize the generator object
 
         Args:
             data_files (dict): A dictionary of labels (as keys) and on-disk numpy array paths (as values).
-                               Keys should be integer strings representing class labels.
+                               Keys should be integer strings representing class labels. The arrays should be
+                               C-contiguous float32 arrays of shape (N, timesteps, features), like those
+                               written by `openwakeword.utils.compute_features_from_generator`, so that each
+                               batch is read from disk as a single sequential slice.
             label_files (dict): A dictionary where the keys are the class labels and the values are the per-example
                                 labels. The values must be the same shape as the correponding numpy data arrays
                                 from the `data_files` argument.
@@ -776,6 +780,10 @@ class mmap_batch_generator:
             label_transform_funcs (dict): A dictionary of transformation functions to apply to each batch of labels.
                                           For example, strings can be mapped to integers or one-hot encoded,
                                           groups of classes can be merged together into one, etc.
+            n_frames (int): The number of frames (timesteps) per example expected by the model. If provided, the
+                            data loaded for any class with a different number of frames is split into consecutive,
+                            non-overlapping windows of `n_frames` (across the examples of the batch), as views of
+                            the mmaped data. This is applied before any `data_transform_funcs`.
         """
         # inputs
         self.data_files = data_files
@@ -783,6 +791,7 @@ class mmap_batch_generator:
         self.n_per_class = n_per_class
         self.data_transform_funcs = data_transform_funcs
         self.label_transform_funcs = label_transform_funcs
+        self.n_frames = n_frames
 
         # Get array mmaps and store their shapes (but load files < 1 GB total size into memory)
         self.data = {label: np.load(fl, mmap_mode='r') for label, fl in data_files.items()}
@@ -803,6 +812,8 @@ class mmap_batch_generator:
             self.n_per_class = {}
             for lbl, shape in self.shapes.items():
                 dummy_data = np.random.random((10, self.shapes[lbl][1], self.shapes[lbl][2]))
+                if self.n_frames:
+                    scale_factor = self._split_frames(dummy_data).shape[0]/10
                 if self.data_transform_funcs.get(lbl, None):
                     scale_factor = self.data_transform_funcs.get(lbl, None)(dummy_data).shape[0]/10
 
@@ -815,6 +826,28 @@ class mmap_batch_generator:
             self.batch_per_epoch = batches_per_epoch
             print("Batches/steps per epoch:", batches_per_epoch)
 
+    def set_shard(self, shard_id: int, n_shards: int):
+        """
+        Moves the starting position in each mmaped array to the start of the `shard_id`-th of `n_shards`
+        equal parts, so that multiple copies of the generator (e.g., one per DataLoader worker process)
+        produce different batches rather than all repeating the same ones.
+
+        Args:
+            shard_id (int): The index of this shard (e.g., the DataLoader worker id)
+            n_shards (int): The total number of shards (e.g., the number of DataLoader workers)
+        """
+        for label, shape in self.shapes.items():
+            self.data_counter[label] = shape[0]*shard_id//n_shards
+
+    def _split_frames(self, x):
+        """Splits a batch of data into windows of `self.n_frames`, if it has a different number of frames"""
+        if self.n_frames and x.shape[1] != self.n_frames:
+            # The final window is dropped if it would end exactly at the last frame
+            x = x.reshape(-1, x.shape[2])
+            n_windows = (x.shape[0] - 1)//self.n_frames
+            x = x[0:n_windows*self.n_frames].reshape(n_windows, self.n_frames, x.shape[1])
+        return x
+
     def __iter__(self):
         return self
 
@@ -832,6 +865,7 @@ class mmap_batch_generator:
                 self.data_counter[label] += x.shape[0]
 
                 # Transform data
+                x = self._split_frames(x)
                 if self.data_transform_funcs and self.data_transform_funcs.get(label):
                     x = self.data_transform_funcs[label](x)
 
@@ -847,9 +881,9 @@ class mmap_batch_generator:
 
                 # Add data to batch
                 X.append(x)
-                y.extend(y_batch)
+                y.append(np.asarray(y_batch))
 
-            return np.vstack(X), np.array(y)
+            return np.vstack(X), np.concatenate(y)
 
 
 # Function to remove empty rows from the end of a mmap array
@@ -873,8 +907,8 @@ def trim_mmap(mmap_path):
     N_new = mmap_file1.shape[0] + i + 1
 
     # Create new mmap_file and copy over data in batches
-    output_file2 = mmap_path.strip(".npy") + "2.npy"
-    mmap_file2 = open_memmap(output_file2, mode='w+', dtype=np.float32,
+    output_file2 = os.path.splitext(mmap_path)[0] + "2.npy"
+    mmap_file2 = open_memmap(output_file2, mode='w+', dtype=mmap_file1.dtype,
                              shape=(N_new, mmap_file1.shape[1], mmap_file1.shape[2]))
 
     for i in tqdm(range(0, mmap_file1.shape[0], 1024), total=mmap_file1.shape[0]//1024, desc="Trimming empty rows"):
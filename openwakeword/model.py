@@ -19,15 +19,55 @@ from openwakeword.utils import AudioFeatures, re_arg
 
 import wave
 import os
+import platform
 import logging
 import functools
 import pickle
-from collections import deque, defaultdict
+from collections import defaultdict
 from functools import partial
+from concurrent.futures import ThreadPoolExecutor
 import time
 from typing import List, Union, DefaultDict, Dict
 
 
+# Define circular buffer for model predictions
+class PredictionBuffer():
+    """
+    A fixed-length circular buffer for model scores, backed by a preallocated Numpy array.
+    Supports the same basic usage as a `collections.deque` with a maximum length (appending,
+    indexing, `len`, and iterating from the oldest to the newest score).
+    """
+    def __init__(self, maxlen: int = 30):
+        self.maxlen = maxlen
+        self.buffer = np.zeros(maxlen, dtype=np.float32)
+        self.n_appended = 0
+        self._last_ndcs: Dict[int, np.ndarray] = {}
+
+    def append(self, x):
+        self.buffer[self.n_appended % self.maxlen] = x
+        self.n_appended += 1
+
+    def last(self, n: int):
+        """Gets the last `n` scores in the buffer (or all of them, if fewer than `n` are available)"""
+        n = min(n, len(self))
+        if n not in self._last_ndcs:
+            self._last_ndcs[n] = np.arange(-n, 0)
+        return self.buffer.take((self.n_appended + self._last_ndcs[n]) % self.maxlen)
+
+    def __len__(self):
+        return min(self.n_appended, self.maxlen)
+
+    def __getitem__(self, ndx):
+        if isinstance(ndx, slice):
+            return self.last(len(self))[ndx]
+        if ndx < -len(self) or ndx >= len(self):
+            raise IndexError("PredictionBuffer index out of range")
+        return self.buffer[(self.n_appended - len(self) + ndx % len(self)) % self.maxlen]
+
+    def __iter__(self):
+        return iter(self.last(len(self)))
+
+
 # Define main model class
 class Model():
     """
@@ -44,6 +84,11 @@ class Model():
             custom_verifier_models: dict = {},
             custom_verifier_threshold: float = 0.1,
             inference_framework: str = "tflite",
+            fuse_models: bool = False,
+            quantize_models: bool = False,
+            parallel: bool = False,
+            low_latency: bool = True,
+            bf16_fastmath: bool = False,
             **kwargs
             ):
         """Initialize the openWakeWord model object.
@@ -78,8 +123,38 @@ class Model():
                                        "tflite" or "onnx". The default is "tflite" as this results in better
                                        efficiency on common platforms (x86, ARM64), but in some deployment
                                        scenarios ONNX models may be preferable.
+            fuse_models (bool): Whether to merge all of the wakeword models into a single ONNX graph with one shared
+                                feature input, so that every model is run with only one call to onnxruntime per frame.
+                                Models with different input lengths are supported by slicing the shared input
+                                inside of the merged graph. The melspectrogram and embedding models of the
+                                preprocessor are also merged into a single graph. Only used with the "onnx" inference
+                                framework, and requires the `onnx` package (`pip install onnx`).
+            quantize_models (bool): Whether to use 8-bit integer versions of the wakeword models (created with the
+                                    dynamic quantization of onnxruntime, and saved next to the original model files
+                                    as `<model_name>.int8.onnx`). This can substantially increase efficiency
+                                    on CPUs with fast integer instructions, with a small change in model scores.
+                                    Only used with the "onnx" inference framework, and requires the `onnx` package.
+            parallel (bool): Whether to run the wakeword models concurrently on a pool of threads (one per model,
+                             up to the number of CPU cores), instead of one after another. Can reduce latency
+                             on multi-core devices when several models are loaded. Not used when `fuse_models`
+                             is enabled. The thread pool is shut down by the `close` method (or when the model
+                             is garbage collected).
+            low_latency (bool): Whether to configure onnxruntime for the lowest latency per frame, with full graph
+                                optimization, memory reuse between runs, and spinning (rather than sleeping) idle
+                                threads. Disable to reduce CPU usage while waiting for audio, at the cost of
+                                slightly higher latency. Only used with the "onnx" inference framework.
+            bf16_fastmath (bool): Whether to let onnxruntime compute the matrix multiplications of the wakeword models
+                                  with bfloat16 instructions, on ARM64 CPUs that support them (e.g., AWS Graviton3).
+                                  This can substantially increase efficiency, with a small change in model scores.
+                                  Ignored (with a warning) on other CPUs, where the models run with full precision.
+                                  Only used with the "onnx" inference framework.
             kwargs (dict): Any other keyword arguments to pass the the preprocessor instance
         """
+        # Save the arguments, so that the model can be re-created when it is unpickled (e.g., in another process)
+        self._init_kwargs = {k: v for k, v in locals().items() if k not in ["self", "kwargs"]}
+        self._init_kwargs.update(kwargs)
+        self._init_kwargs["wakeword_models"] = list(wakeword_models)
+
         # Get model paths for pre-trained models if user doesn't provide models to load
         pretrained_model_paths = openwakeword.get_pretrained_model_paths(inference_framework)
         wakeword_model_names = []
@@ -104,6 +179,8 @@ class Model():
         self.model_inputs = {}
         self.model_outputs = {}
         self.model_prediction_function = {}
+        self._feature_buffers = {}
+        self._output_scores = {}
         self.class_mapping = {}
         self.custom_verifier_models = {}
         self.custom_verifier_threshold = custom_verifier_threshold
@@ -134,28 +211,64 @@ class Model():
             try:
                 import onnxruntime as ort
 
-                def onnx_predict(onnx_model, x):
-                    return onnx_model.run(None, {onnx_model.get_inputs()[0].name: x})
+                def onnx_predict(onnx_model, io_binding, input_buffer, output_buffer, x):
+                    # Copy features into the input buffer bound to the session (unless they were already written
+                    # there), and run the model so that the prediction is written directly into the bound output buffer
+                    if x is not input_buffer:
+                        np.copyto(input_buffer, x)
+                    onnx_model.run_with_iobinding(io_binding)
+                    return [output_buffer]
 
             except ImportError:
                 raise ValueError("Tried to import onnxruntime, but it was not found. Please install it using `pip install onnxruntime`")
 
+            # Initialize ONNX options
+            sessionOptions = ort.SessionOptions()
+            sessionOptions.inter_op_num_threads = 1
+            sessionOptions.intra_op_num_threads = 1
+            if low_latency:
+                # Optimize the graphs fully and reuse memory between runs, so that no allocations happen per frame,
+                # and let idle threads spin instead of sleeping to avoid wake-up latency
+                sessionOptions.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+                sessionOptions.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+                sessionOptions.enable_mem_pattern = True
+                sessionOptions.enable_cpu_mem_arena = True
+                sessionOptions.add_session_config_entry("session.intra_op.allow_spinning", "1")
+            else:
+                sessionOptions.add_session_config_entry("session.intra_op.allow_spinning", "0")
+
+            if bf16_fastmath:
+                if _cpu_supports_bf16():
+                    sessionOptions.add_session_config_entry("mlas.enable_gemm_fastmath_arm64_bfloat16", "1")
+                else:
+                    logging.warning("bfloat16 fast math was requested, but it is only supported on ARM64 CPUs with "
+                                    "bfloat16 instructions. Using full precision instead.")
+
+        onnx_model_paths = []
         for mdl_path, mdl_name in zip(wakeword_models, wakeword_model_names):
             # Load openwakeword models
             if inference_framework == "onnx":
                 if ".tflite" in mdl_path:
                     raise ValueError("The onnx inference framework is selected, but tflite models were provided!")
 
-                sessionOptions = ort.SessionOptions()
-                sessionOptions.inter_op_num_threads = 1
-                sessionOptions.intra_op_num_threads = 1
-
-                self.models[mdl_name] = ort.InferenceSession(mdl_path, sess_options=sessionOptions,
+                onnx_model_paths.append(_quantize_onnx_model(mdl_path) if quantize_models else mdl_path)
+                self.models[mdl_name] = ort.InferenceSession(onnx_model_paths[-1], sess_options=sessionOptions,
                                                              providers=["CPUExecutionProvider"])
 
                 self.model_inputs[mdl_name] = self.models[mdl_name].get_inputs()[0].shape[1]
                 self.model_outputs[mdl_name] = self.models[mdl_name].get_outputs()[0].shape[1]
-                pred_function = functools.partial(onnx_predict, self.models[mdl_name])
+                # Bind preallocated input/output buffers to the session to avoid allocations on every prediction
+                onnx_input = self.models[mdl_name].get_inputs()[0]
+                onnx_output = self.models[mdl_name].get_outputs()[0]
+                input_buffer = np.zeros([i if isinstance(i, int) else 1 for i in onnx_input.shape], dtype=np.float32)
+                output_buffer = np.zeros([i if isinstance(i, int) else 1 for i in onnx_output.shape], dtype=np.float32)
+                io_binding = self.models[mdl_name].io_binding()
+                io_binding.bind_ortvalue_input(onnx_input.name, ort.OrtValue.ortvalue_from_numpy(input_buffer))
+                io_binding.bind_ortvalue_output(onnx_output.name, ort.OrtValue.ortvalue_from_numpy(output_buffer))
+                self._feature_buffers[mdl_name] = input_buffer
+                self._output_scores[mdl_name] = output_buffer.reshape(-1)  # flat view of the output buffer
+
+                pred_function = functools.partial(onnx_predict, self.models[mdl_name], io_binding, input_buffer, output_buffer)
                 self.model_prediction_function[mdl_name] = pred_function
 
             if inference_framework == "tflite":
@@ -171,11 +284,14 @@ class Model():
                 tflite_input_index = self.models[mdl_name].get_input_details()[0]['index']
                 tflite_output_index = self.models[mdl_name].get_output_details()[0]['index']
 
+                self._feature_buffers[mdl_name] = np.zeros(self.models[mdl_name].get_input_details()[0]['shape'],
+                                                           dtype=np.float32)
+
                 pred_function = functools.partial(tflite_predict, self.models[mdl_name], tflite_input_index, tflite_output_index)
                 self.model_prediction_function[mdl_name] = pred_function
 
             if class_mapping_dicts and class_mapping_dicts[wakeword_models.index(mdl_path)].get(mdl_name, None):
-                self.class_mapping[mdl_name] = class_mapping_dicts[wakeword_models.index(mdl_path)]
+                self.class_mapping[mdl_name] = class_mapping_dicts[wakeword_models.index(mdl_path)][mdl_name]
             elif openwakeword.model_class_mappings.get(mdl_name, None):
                 self.class_mapping[mdl_name] = openwakeword.model_class_mappings[mdl_name]
             else:
@@ -194,8 +310,55 @@ class Model():
                     " that has the same base models but doesn't have custom verifier models."
                 )
 
+        # Map prediction labels to their parent models, for fast lookups during prediction
+        self._label_to_parent = {}
+        for mdl, mapping in self.class_mapping.items():
+            for label in list(mapping.values()) + [mdl]:
+                self._label_to_parent[label] = mdl
+
+        # Get the output indices and labels of multi-class models, to get all of the class scores at once
+        self._multi_idx = {}
+        self._multi_labels = {}
+        for mdl, mapping in self.class_mapping.items():
+            if self.model_outputs[mdl] != 1:
+                self._multi_idx[mdl] = np.array([int(i) for i in mapping.keys()], dtype=np.intp)
+                self._multi_labels[mdl] = list(mapping.values())
+
+        # Collect the attributes of each model used during prediction, to avoid repeated dictionary lookups per frame
+        self._model_records: List[tuple] = [
+            (mdl, self.model_inputs[mdl], self.model_outputs[mdl], self._feature_buffers[mdl],
+             self.model_prediction_function[mdl], self._output_scores.get(mdl), self._multi_idx.get(mdl),
+             self._multi_labels.get(mdl))
+            for mdl in self.models.keys()
+        ]
+
+        # Merge the ONNX models into a single graph, if requested
+        self._fused = None
+        if fuse_models and inference_framework == "onnx" and self.models != {}:
+            fused_model, self._fused_n_frames, self._fused_output_ndcs = _fuse_onnx_models(
+                onnx_model_paths, wakeword_model_names
+            )
+            self._fused = ort.InferenceSession(fused_model, sess_options=sessionOptions,
+                                               providers=["CPUExecutionProvider"])
+            self._fused_input_name = self._fused.get_inputs()[0].name
+            self._fused_features = np.zeros([i if isinstance(i, int) else 1 for i in self._fused.get_inputs()[0].shape],
+                                            dtype=np.float32)
+
+        # Create thread pool to run the models concurrently, if requested
+        # (shutting down the pool from any previous initialization of the object, e.g. when unpickling)
+        self.close()
+        if parallel and self._fused is None and len(self.models) > 1:
+            self._pool = ThreadPoolExecutor(max_workers=min(len(self.models), os.cpu_count() or 1))
+
+        # Use a specialized prediction method if there is a single model with a single output,
+        # and none of the options that require additional processing of the scores are enabled
+        self._single_model: Union[str, None] = None
+        if len(self.models) == 1 and list(self.model_outputs.values())[0] == 1 and self._fused is None \
+                and not enable_speex_noise_suppression and vad_threshold == 0 and self.custom_verifier_models == {}:
+            self._single_model = list(self.models.keys())[0]
+
         # Create buffer to store frame predictions
-        self.prediction_buffer: DefaultDict[str, deque] = defaultdict(partial(deque, maxlen=30))
+        self.prediction_buffer: DefaultDict[str, PredictionBuffer] = defaultdict(partial(PredictionBuffer, maxlen=30))
 
         # Initialize SpeexDSP noise canceller
         if enable_speex_noise_suppression:
@@ -210,22 +373,38 @@ class Model():
             self.vad = openwakeword.VAD()
 
         # Create AudioFeatures object
-        self.preprocessor = AudioFeatures(inference_framework=inference_framework, **kwargs)
+        self.preprocessor = AudioFeatures(inference_framework=inference_framework, fuse_models=fuse_models, **kwargs)
+
+    def __getstate__(self):
+        """
+        Gets the state of the model for pickling. The inference sessions can't be pickled, so only the arguments
+        used to create the model are saved, and the model is re-created with them when unpickled. The unpickled model
+        starts with empty prediction and audio buffers, like a new model.
+        """
+        return self._init_kwargs
+
+    def __setstate__(self, state):
+        self.__init__(**state)
+
+    def close(self):
+        """
+        Shuts down the thread pool used to run the models concurrently (when `parallel=True`). The model can
+        still be used afterwards, but the models will run sequentially.
+        """
+        if getattr(self, "_pool", None) is not None:
+            self._pool.shutdown(wait=False)
+        self._pool = None
+
+    def __del__(self):
+        self.close()
 
     def get_parent_model_from_label(self, label):
         """Gets the parent model associated with a given prediction label"""
-        parent_model = ""
-        for mdl in self.class_mapping.keys():
-            if label in self.class_mapping[mdl].values():
-                parent_model = mdl
-            elif label in self.class_mapping.keys() and label == mdl:
-                parent_model = mdl
-
-        return parent_model
+        return self._label_to_parent.get(label, "")
 
     def reset(self):
         """Reset the prediction buffer"""
-        self.prediction_buffer = defaultdict(partial(deque, maxlen=30))
+        self.prediction_buffer = defaultdict(partial(PredictionBuffer, maxlen=30))
 
     def predict(self, x: np.ndarray, patience: dict = {}, threshold: dict = {}, timing: bool = False):
         """Predict with all of the wakeword models on the input audio frames
@@ -257,59 +436,104 @@ class Model():
         if not isinstance(x, np.ndarray):
             raise ValueError(f"The input audio data (x) must by a Numpy array, instead received an object of type {type(x)}.")
 
-        # Setup timing dict
         if timing:
-            timing_dict: Dict[str, Dict] = {}
-            timing_dict["models"] = {}
-            feature_start = time.time()
+            return self._predict_timed(x, patience, threshold)
+        elif self._single_model is not None and patience == {}:
+            return self._predict_single_model(self._single_model, x)
+        else:
+            return self._predict_core(x, patience, threshold)
+
+    def _predict_core(self, x: np.ndarray, patience: dict = {}, threshold: dict = {}):
+        """The implementation of the `predict` method without timing information"""
+        n_prepared_samples = self._preprocess(x)
+        model_predictions = self._predict_all_models(n_prepared_samples)
+
+        predictions: dict = {}
+        self._run_models(self._model_records, n_prepared_samples, model_predictions, predictions)
+
+        self._update_scores(predictions, patience, threshold)
+
+        if self.vad_threshold > 0:
+            self.vad(x)
+            self._filter_with_vad(predictions)
+
+        return predictions
+
+    def _predict_timed(self, x: np.ndarray, patience: dict = {}, threshold: dict = {}):
+        """The implementation of the `predict` method with timing information for the preprocessor and each model"""
+        timing_dict: Dict[str, Dict] = {}
+        timing_dict["models"] = {}
+
+        feature_start = time.perf_counter()
+        n_prepared_samples = self._preprocess(x)
+        timing_dict["models"]["preprocessor"] = time.perf_counter() - feature_start
 
-        # Get audio features (optionally with Speex noise suppression)
+        model_predictions = self._predict_all_models(n_prepared_samples)
+
+        predictions: dict = {}
+        for record in self._model_records:
+            model_start = time.perf_counter()
+            self._run_models([record], n_prepared_samples, model_predictions, predictions)
+            timing_dict["models"][record[0]] = time.perf_counter() - model_start
+
+        self._update_scores(predictions, patience, threshold)
+
+        if self.vad_threshold > 0:
+            vad_start = time.perf_counter()
+            self.vad(x)
+            timing_dict["models"]["vad"] = time.perf_counter() - vad_start
+            self._filter_with_vad(predictions)
+
+        return predictions, timing_dict
+
+    def _preprocess(self, x: np.ndarray):
+        """Gets audio features (optionally with Speex noise suppression), and returns the number of processed samples"""
         if self.speex_ns:
-            n_prepared_samples = self.preprocessor(self._suppress_noise_with_speex(x))
+            return self.preprocessor(self._suppress_noise_with_speex(x))
         else:
-            n_prepared_samples = self.preprocessor(x)
-
-        if timing:
-            timing_dict["models"]["preprocessor"] = time.time() - feature_start
+            return self.preprocessor(x)
 
-        # Get predictions from model(s)
-        predictions = {}
-        for mdl in self.models.keys():
-            if timing:
-                model_start = time.time()
-
-            # Run model to get predictions
-            if n_prepared_samples > 1280:
-                group_predictions = []
-                for i in np.arange(n_prepared_samples//1280-1, -1, -1):
-                    group_predictions.extend(
-                        self.model_prediction_function[mdl](
-                            self.preprocessor.get_features(
-                                    self.model_inputs[mdl],
-                                    start_ndx=-self.model_inputs[mdl] - i
-                            )
-                        )
-                    )
-                prediction = np.array(group_predictions).max(axis=0)[None, ]
+    def _predict_all_models(self, n_prepared_samples: int):
+        """
+        Gets predictions from all models with a single call if they are merged into one ONNX graph,
+        or concurrently if the models are run in parallel. Otherwise, returns an empty dictionary.
+        """
+        if self._fused is not None and n_prepared_samples >= 1280:
+            return self._predict_fused(n_prepared_samples)
+        elif self._pool is not None and n_prepared_samples >= 1280:
+            futures = {mdl: self._pool.submit(self._predict_model, mdl, n_prepared_samples) for mdl in self.models.keys()}
+            return {mdl: future.result() for mdl, future in futures.items()}
+        return {}
+
+    def _run_models(self, model_records: List[tuple], n_prepared_samples: int, model_predictions: dict, predictions: dict):
+        """
+        Gets the predictions from the models in `model_records` (unless they are already in `model_predictions`),
+        and adds the scores for each label to the `predictions` dictionary.
+        """
+        for mdl, n_inputs, n_outputs, features, pred_function, output_scores, multi_idx, multi_labels in model_records:
+            # Run model to get the scores for each class
+            if model_predictions:
+                scores = model_predictions[mdl][0][0]
             elif n_prepared_samples == 1280:
-                prediction = self.model_prediction_function[mdl](
-                    self.preprocessor.get_features(self.model_inputs[mdl])
-                )
+                prediction = pred_function(self.preprocessor.get_features_into(features))
+                # ONNX models write the scores into the bound output buffer, so read them from its flat view
+                scores = output_scores if output_scores is not None else prediction[0][0]
+            elif n_prepared_samples > 1280:
+                scores = self._predict_model(mdl, n_prepared_samples)[0][0]
             elif n_prepared_samples < 1280:  # get previous prediction if there aren't enough samples
-                if self.model_outputs[mdl] == 1:
+                if n_outputs == 1:
                     if len(self.prediction_buffer[mdl]) > 0:
-                        prediction = [[[self.prediction_buffer[mdl][-1]]]]
+                        scores = [self.prediction_buffer[mdl][-1]]
                     else:
-                        prediction = [[[0]]]
-                elif self.model_outputs[mdl] != 1:
+                        scores = [0]
+                elif n_outputs != 1:
                     n_classes = max([int(i) for i in self.class_mapping[mdl].keys()])
-                    prediction = [[[0]*(n_classes+1)]]
+                    scores = [0]*(n_classes+1)
 
-            if self.model_outputs[mdl] == 1:
-                predictions[mdl] = prediction[0][0][0]
+            if n_outputs == 1:
+                predictions[mdl] = scores[0]
             else:
-                for int_label, cls in self.class_mapping[mdl].items():
-                    predictions[cls] = prediction[0][0][int(int_label)]
+                predictions.update(zip(multi_labels, np.take(scores, multi_idx)))
 
             # Update scores based on custom verifier model
             if self.custom_verifier_models != {}:
@@ -318,19 +542,17 @@ class Model():
                         parent_model = self.get_parent_model_from_label(cls)
                         if self.custom_verifier_models.get(parent_model, False):
                             verifier_prediction = self.custom_verifier_models[parent_model].predict_proba(
-                                self.preprocessor.get_features(self.model_inputs[mdl])
+                                self.preprocessor.get_features(n_inputs)
                             )[0][-1]
                             predictions[cls] = verifier_prediction
 
-            # Update prediction buffer, and zero predictions for first 5 frames during model initialization
-            for cls in predictions.keys():
-                if len(self.prediction_buffer[cls]) < 5:
-                    predictions[cls] = 0.0
-                self.prediction_buffer[cls].append(predictions[cls])
-
-            # Get timing information
-            if timing:
-                timing_dict["models"][mdl] = time.time() - model_start
+    def _update_scores(self, predictions: dict, patience: dict = {}, threshold: dict = {}):
+        """Updates the prediction buffer with the new scores, and applies the initialization and patience rules"""
+        # Update prediction buffer (once per frame), and zero predictions for first 5 frames during model initialization
+        for cls in predictions.keys():
+            if len(self.prediction_buffer[cls]) < 5:
+                predictions[cls] = 0.0
+            self.prediction_buffer[cls].append(predictions[cls])
 
         # Update scores based on thresholds or patience arguments
         if patience != {}:
@@ -340,34 +562,141 @@ class Model():
             for mdl in predictions.keys():
                 parent_model = self.get_parent_model_from_label(mdl)
                 if parent_model in patience.keys():
-                    scores = np.array(self.prediction_buffer[mdl])[-patience[parent_model]:]
+                    scores = self.prediction_buffer[mdl].last(patience[parent_model])
                     if (scores >= threshold[parent_model]).sum() < patience[parent_model]:
                         predictions[mdl] = 0.0
 
-        # (optionally) get voice activity detection scores and update model scores
-        if self.vad_threshold > 0:
-            if timing:
-                vad_start = time.time()
+    def _filter_with_vad(self, predictions: dict):
+        """Sets the scores to zero if the voice activity detection scores are below the threshold"""
+        # Get frames from last 0.4 to 0.56 seconds (3 frames) before the current
+        # frame and get max VAD score
+        vad_frames = list(self.vad.prediction_buffer)[-7:-4]
+        vad_max_score = np.max(vad_frames) if len(vad_frames) > 0 else 0
+        for mdl in predictions.keys():
+            if vad_max_score < self.vad_threshold:
+                predictions[mdl] = 0.0
+
+    def _predict_single_model(self, mdl: str, x: np.ndarray):
+        """
+        A specialized version of the `predict` method for when a single model with a single output is loaded,
+        and the patience, timing, noise suppression, voice activity detection, and custom verifier model
+        options are not used. Returns the same predictions as the general method with less overhead per frame.
 
-            self.vad(x)
+        Args:
+            mdl (str): The name of the model
+            x (ndarray): The input audio data to predict on with the model
 
-            if timing:
-                timing_dict["models"]["vad"] = time.time() - vad_start
+        Returns:
+            dict: A dictionary with the model name as the key and the score as the value
+        """
+        prediction_buffer = self.prediction_buffer[mdl]
 
-            # Get frames from last 0.4 to 0.56 seconds (3 frames) before the current
-            # frame and get max VAD score
-            vad_frames = list(self.vad.prediction_buffer)[-7:-4]
-            vad_max_score = np.max(vad_frames) if len(vad_frames) > 0 else 0
-            for mdl in predictions.keys():
-                if vad_max_score < self.vad_threshold:
-                    predictions[mdl] = 0.0
+        n_prepared_samples = self.preprocessor(x)
+        if n_prepared_samples == 1280 and mdl in self._output_scores:
+            self.model_prediction_function[mdl](self.preprocessor.get_features_into(self._feature_buffers[mdl]))
+            score = self._output_scores[mdl][0]
+        elif n_prepared_samples >= 1280:
+            score = self._predict_model(mdl, n_prepared_samples)[0][0][0]
+        else:  # get previous prediction if there aren't enough samples
+            score = prediction_buffer[-1] if len(prediction_buffer) > 0 else 0
 
-        if timing:
-            return predictions, timing_dict
+        # Zero predictions for first 5 frames during model initialization, and update prediction buffer
+        if len(prediction_buffer) < 5:
+            score = 0.0
+        prediction_buffer.append(score)
+
+        return {mdl: score}
+
+    def _predict_model(self, mdl: str, n_prepared_samples: int):
+        """
+        Gets the prediction of a single model for the newest audio features. When more than one frame
+        (1280 samples) of audio is processed, the maximum score over all of the frames is returned.
+
+        Args:
+            mdl (str): The name of the model
+            n_prepared_samples (int): The number of new audio samples processed by the preprocessor
+
+        Returns:
+            ndarray: The prediction of the model
+        """
+        if n_prepared_samples > 1280:
+            group_predictions = []
+            for i in np.arange(n_prepared_samples//1280-1, -1, -1):
+                group_predictions.extend(
+                    [j.copy() for j in self.model_prediction_function[mdl](
+                        self.preprocessor.get_features_into(
+                                self._feature_buffers[mdl],
+                                start_ndx=-self.model_inputs[mdl] - i
+                        )
+                    )]  # copy, as ONNX models reuse the same output buffer for every prediction
+                )
+            return np.array(group_predictions).max(axis=0)[None, ]
         else:
-            return predictions
+            return self.model_prediction_function[mdl](
+                self.preprocessor.get_features_into(self._feature_buffers[mdl])
+            )
+
+    def _predict_fused(self, n_prepared_samples: int):
+        """
+        Gets the predictions from all of the models merged into a single ONNX graph, with one call
+        to onnxruntime per frame of audio features.
 
-    def predict_clip(self, clip: Union[str, np.ndarray], padding: int = 1, chunk_size=1280, **kwargs):
+        Args:
+            n_prepared_samples (int): The number of new audio samples processed by the preprocessor
+
+        Returns:
+            dict: A dictionary with model names as keys and prediction arrays as values, matching the
+                  format of the predictions returned by the per-model prediction functions.
+        """
+        fused_predictions: Dict[str, list] = {}
+        for i in np.arange(n_prepared_samples//1280-1, -1, -1):
+            outputs = self._fused.run(None, {  # type: ignore[union-attr]
+                self._fused_input_name: self.preprocessor.get_features_into(
+                    self._fused_features,
+                    start_ndx=-self._fused_n_frames - i
+                )
+            })
+            for mdl, ndx in self._fused_output_ndcs.items():
+                fused_predictions.setdefault(mdl, []).append(outputs[ndx])
+
+        if n_prepared_samples > 1280:
+            return {mdl: np.array(preds).max(axis=0)[None, ] for mdl, preds in fused_predictions.items()}
+        return fused_predictions
+
+    def predict_batch(self, x: np.ndarray):
+        """Predict with all of the wakeword models on a batch of audio feature windows. Unlike the `predict`
+        method, this does not update the prediction buffer or apply any post-processing to the scores.
+
+        Args:
+            x (ndarray): The audio features to predict on, with shape (batch_size, n_frames, 96). Each model
+                         uses the last `self.model_inputs[model_name]` frames of every window, so `n_frames`
+                         must be at least the largest number of input frames of the loaded models.
+
+        Returns:
+            dict: A dictionary with the prediction labels as keys and arrays of shape (batch_size,)
+                  with the scores for each window as values.
+        """
+        predictions = {}
+        for mdl in self.models.keys():
+            mdl_x = np.ascontiguousarray(x[:, -self.model_inputs[mdl]:, :], dtype=np.float32)
+            onnx_inputs = self.models[mdl].get_inputs() if hasattr(self.models[mdl], "get_inputs") else []
+            if onnx_inputs and not isinstance(onnx_inputs[0].shape[0], int):
+                # ONNX models with a dynamic batch dimension predict on the whole batch at once
+                prediction = self.models[mdl].run(None, {onnx_inputs[0].name: mdl_x})[0]
+            else:
+                prediction = np.vstack([np.array(self.model_prediction_function[mdl](mdl_x[i:i+1])[0][0])
+                                        for i in range(mdl_x.shape[0])])  # copy, as ONNX output buffers are reused
+
+            prediction = prediction.reshape(mdl_x.shape[0], -1)
+            if self.model_outputs[mdl] == 1:
+                predictions[mdl] = prediction[:, 0]
+            else:
+                predictions.update(zip(self._multi_labels[mdl], prediction[:, self._multi_idx[mdl]].T))
+
+        return predictions
+
+    def predict_clip(self, clip: Union[str, np.ndarray], padding: int = 1, chunk_size=1280, batch_size: int = 1,
+                     **kwargs):
         """Predict on an full audio clip, simulating streaming prediction.
         The input clip must bit a 16-bit, 16 khz, single-channel WAV file.
 
@@ -377,6 +706,12 @@ class Model():
             padding (int): How many seconds of silence to pad the start/end of the clip with
                             to make sure that short clips can be processed correctly (default: 1)
             chunk_size (int): The size (in samples) of each chunk of audio to pass to the model
+            batch_size (int): The number of frames to predict on at once with the wakeword models (default: 1,
+                              no batching). Batching is only used with the default `chunk_size` of 1280 samples
+                              and when noise suppression, voice activity detection, custom verifier models,
+                              fused models, and timing are not enabled. The results are the same as predicting
+                              on each frame separately. Batching mainly helps with models that have a dynamic
+                              batch dimension, as other models still predict on one frame at a time.
             kwargs: Any keyword arguments to pass to the class `predict` method
 
         Returns:
@@ -391,22 +726,92 @@ class Model():
             data = clip
 
         if padding:
-            data = np.concatenate(
-                (
-                    np.zeros(16000*padding).astype(np.int16),
-                    data,
-                    np.zeros(16000*padding).astype(np.int16)
-                )
-            )
-
-        # Iterate through clip, getting predictions
+            # Copy the clip into a single preallocated array that includes the padding
+            padded_data = np.zeros(data.shape[0] + 2*16000*padding, dtype=np.int16)
+            padded_data[16000*padding:16000*padding + data.shape[0]] = data
+            data = padded_data
+
+        # Predict on batches of frames, if possible
+        if chunk_size == 1280 and batch_size > 1 and self.models != {} and not kwargs.get("timing", False) \
+                and self.speex_ns is None and self.vad_threshold == 0 and self.custom_verifier_models == {} \
+                and self._fused is None \
+                and self.preprocessor.accumulated_samples == 0 and self.preprocessor.raw_data_remainder.shape[0] == 0:
+            return self._predict_clip_batched(data, batch_size, **kwargs)
+
+        # Iterate through the chunks of the clip (as rows of a 2D view of the data), getting predictions
         predictions = []
         step_size = chunk_size
-        for i in range(0, data.shape[0]-step_size, step_size):
-            predictions.append(self.predict(data[i:i+step_size], **kwargs))
+        n_steps = len(range(0, data.shape[0]-step_size, step_size))
+        for chunk in data[0:n_steps*step_size].reshape(n_steps, step_size):
+            predictions.append(self.predict(chunk, **kwargs))
 
         return predictions
 
+    def _predict_clip_batched(self, data: np.ndarray, batch_size: int, patience: dict = {}, threshold: dict = {},
+                              timing: bool = False):
+        """
+        Predicts on each frame (1280 samples) of the input audio data, matching the results of calling the
+        `predict` method on each frame. The audio features are computed frame by frame (as in streaming
+        prediction), while the wakeword models predict on batches of frames and the post-processing of the
+        scores (initialization, patience) is applied to all of the frames at once.
+
+        Args:
+            data (ndarray): The 16-bit, 16 khz audio data to predict on
+            batch_size (int): The number of frames to predict on at once with the wakeword models
+            patience (dict): See the `predict` method
+            threshold (dict): See the `predict` method
+            timing (bool): Accepted for compatibility with the `predict` method. Batching is only used
+                           when timing is disabled, so this is always False.
+
+        Returns:
+            list: A list containing the frame-level prediction dictionaries for the audio data
+        """
+        if patience != {} and threshold == {}:
+            raise ValueError("Error! When using the `patience` argument, threshold "
+                             "values must be provided via the `threshold` argument!")
+
+        # Get the audio features for each frame, keeping enough history for the first frames
+        n_frames = max(self.model_inputs.values())
+        features = [self.preprocessor.feature_buffer[self.preprocessor.feature_buffer.shape[0] - n_frames + 1:]]
+        n_steps = len(range(0, data.shape[0]-1280, 1280))
+        for frame in data[0:n_steps*1280].reshape(n_steps, 1280):
+            self.preprocessor(frame)
+            features.append(self.preprocessor.feature_buffer[-1:])
+
+        windows = np.lib.stride_tricks.sliding_window_view(np.vstack(features), n_frames, axis=0).transpose(0, 2, 1)
+        if windows.shape[0] == 0:
+            return []
+
+        # Get predictions from model(s)
+        batch_predictions = [self.predict_batch(windows[i:i+batch_size]) for i in range(0, windows.shape[0], batch_size)]
+        scores = {cls: np.concatenate([i[cls] for i in batch_predictions]) for cls in batch_predictions[0].keys()}
+
+        for cls in scores.keys():
+            # Zero predictions for first 5 frames during model initialization, and update prediction buffer
+            n_init = max(0, 5 - len(self.prediction_buffer[cls]))
+            scores[cls][:n_init] = 0.0
+            history = self.prediction_buffer[cls].last(self.prediction_buffer[cls].maxlen)
+            for score in scores[cls][-self.prediction_buffer[cls].maxlen:]:
+                self.prediction_buffer[cls].append(score)
+
+            # Update scores based on thresholds and patience arguments
+            parent_model = self.get_parent_model_from_label(cls)
+            if parent_model in patience.keys():
+                n_patience = patience[parent_model]
+                if n_patience > self.prediction_buffer[cls].maxlen:
+                    # As in the `predict` method, the patience can't be met if it's longer than the prediction buffer
+                    scores[cls][:] = 0.0
+                    continue
+                above_threshold = np.concatenate(
+                    (history[len(history)-n_patience+1:] if n_patience > 1 else history[:0], scores[cls])
+                ) >= threshold[parent_model]
+                n_above_threshold = np.convolve(above_threshold, np.ones(n_patience, dtype=int), mode="valid")
+                n_above_threshold = np.concatenate((np.zeros(len(scores[cls]) - len(n_above_threshold), dtype=int),
+                                                    n_above_threshold))
+                scores[cls][n_above_threshold < n_patience] = 0.0
+
+        return [{cls: scores[cls][i] for cls in scores.keys()} for i in range(windows.shape[0])]
+
     def _get_positive_prediction_frames(
             self,
             file: str,
@@ -484,3 +889,120 @@ class Model():
         cleaned_bytestring = b''.join(cleaned)
         cleaned_array = np.frombuffer(cleaned_bytestring, np.int16)
         return cleaned_array
+
+
+def _fuse_onnx_models(model_paths: List[str], model_names: List[str], input_name: str = "features"):
+    """
+    Merges multiple ONNX wakeword models into a single ONNX graph with one shared feature input
+    and the outputs of every model. Models that use fewer feature frames than the longest model
+    get a Slice node that selects the most recent frames from the shared input.
+
+    Args:
+        model_paths (List[str]): The paths of the ONNX models to merge
+        model_names (List[str]): The names of the models, used to prefix the nodes of each graph
+        input_name (str): The name of the shared input of the merged graph
+
+    Returns:
+        tuple: The serialized merged model, the number of feature frames of the shared input,
+               and a dictionary with model names as keys and the indices of their outputs as values.
+    """
+    try:
+        import onnx
+        from onnx import helper
+    except ImportError:
+        raise ValueError("Tried to import onnx to merge the models, but it was not found. Please install it using `pip install onnx`")
+
+    models = [onnx.load(i) for i in model_paths]
+    opsets = [{opset.domain: opset.version for opset in mdl.opset_import} for mdl in models]
+    if any([opset != opsets[0] for opset in opsets]):
+        raise ValueError("Only ONNX models that use the same opset versions can be merged into a single graph!")
+
+    n_frames = [mdl.graph.input[0].type.tensor_type.shape.dim[1].dim_value for mdl in models]
+    shared_input = models[int(np.argmax(n_frames))].graph.input[0]
+
+    nodes: list = []
+    initializers: list = []
+    value_info: list = []
+    outputs: list = []
+    output_ndcs = {}
+    for mdl, mdl_name, mdl_n_frames in zip(models, model_names, n_frames):
+        mdl = onnx.compose.add_prefix(mdl, prefix=mdl_name + "/")
+        mdl_input_name = mdl.graph.input[0].name
+        if mdl_n_frames == max(n_frames):
+            nodes.append(helper.make_node("Identity", [input_name], [mdl_input_name]))
+        else:
+            slice_args = [mdl_input_name + "_slice_" + i for i in ["starts", "ends", "axes"]]
+            initializers.extend([
+                onnx.numpy_helper.from_array(np.array([-mdl_n_frames], dtype=np.int64), slice_args[0]),
+                onnx.numpy_helper.from_array(np.array([max(n_frames)], dtype=np.int64), slice_args[1]),
+                onnx.numpy_helper.from_array(np.array([1], dtype=np.int64), slice_args[2])
+            ])
+            nodes.append(helper.make_node("Slice", [input_name] + slice_args, [mdl_input_name]))
+
+        nodes.extend(mdl.graph.node)
+        initializers.extend(mdl.graph.initializer)
+        value_info.extend(mdl.graph.value_info)
+        output_ndcs[mdl_name] = len(outputs)
+        outputs.append(mdl.graph.output[0])
+
+    graph_input = onnx.ValueInfoProto()
+    graph_input.CopyFrom(shared_input)
+    graph_input.name = input_name
+    graph = helper.make_graph(nodes, "openwakeword_fused_models", [graph_input], outputs,
+                              initializer=initializers, value_info=value_info)
+    fused_model = helper.make_model(graph, opset_imports=models[0].opset_import)
+    fused_model.ir_version = max([mdl.ir_version for mdl in models])
+
+    return fused_model.SerializeToString(), max(n_frames), output_ndcs
+
+
+def _quantize_onnx_model(model_path: str):
+    """
+    Gets the path of an 8-bit integer version of an ONNX model, creating it with the dynamic quantization
+    from onnxruntime if it doesn't already exist. The quantized model is saved in the same directory as the
+    original model, with the same name and the extension ".int8.onnx".
+
+    Args:
+        model_path (str): The path of the ONNX model to quantize
+
+    Returns:
+        str: The path of the quantized model, or the original path if the quantized model couldn't be saved
+    """
+    if model_path.endswith(".int8.onnx"):
+        return model_path
+
+    quantized_model_path = os.path.splitext(model_path)[0] + ".int8.onnx"
+    if not os.path.exists(quantized_model_path):
+        try:
+            from onnxruntime.quantization import quantize_dynamic, QuantType
+        except ImportError:
+            raise ValueError("Tried to import onnxruntime.quantization to quantize the models, but it was not found. "
+                             "Please install the onnx package using `pip install onnx`")
+
+        try:
+            quantize_dynamic(model_path, quantized_model_path, weight_type=QuantType.QInt8,
+                             op_types_to_quantize=["MatMul", "Gemm"])
+        except OSError:
+            logging.warning(f"Could not save a quantized version of the model '{model_path}', "
+                            "using the original model instead.")
+            return model_path
+
+    return quantized_model_path
+
+
+def _cpu_supports_bf16():
+    """
+    Checks whether the CPU is an ARM64 CPU with bfloat16 instructions, which onnxruntime can use
+    for the matrix multiplications of fp32 models. Currently only detects support on Linux.
+
+    Returns:
+        bool: Whether the CPU supports bfloat16 instructions
+    """
+    if platform.machine().lower() not in ["aarch64", "arm64"]:
+        return False
+
+    try:
+        with open("/proc/cpuinfo") as f:
+            return "bf16" in f.read().split()
+    except OSError:
+        return False
@@ -11,6 +11,8 @@ import numpy as np
 import scipy
 import collections
 import argparse
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 import logging
 from tqdm import tqdm
 import yaml
@@ -23,7 +25,7 @@ from openwakeword.utils import compute_features_from_generator
 # Base model class for an openwakeword model
 class Model(nn.Module):
     def __init__(self, n_classes=1, input_shape=(16, 96), model_type="dnn",
-                 layer_dim=128, seconds_per_example=None):
+                 layer_dim=128, seconds_per_example=None, compile_model=False):
         super().__init__()
 
         # Store inputs as attributes
@@ -31,6 +33,7 @@ class Model(nn.Module):
         self.input_shape = input_shape
         self.seconds_per_example = seconds_per_example
         self.device = torch.device('cuda:0' if torch.cuda.is_available() else 'cpu')
+        self.use_bf16 = self.device.type == "cuda" and torch.cuda.is_bf16_supported()
         self.best_models = []
         self.best_model_scores = []
         self.best_val_fp = 1000
@@ -60,11 +63,33 @@ class Model(nn.Module):
                     self.layer2 = nn.Linear(64*2, n_classes)
                     self.layer3 = nn.Sigmoid() if n_classes == 1 else nn.ReLU()
 
+                def logits(self, x):
+                    # The output at the last timestep is used rather than the final hidden states (h_n),
+                    # as the final hidden state of the backward direction is from the first timestep
+                    out, _ = self.layer1(x)
+                    return self.layer2(out[:, -1])
+
                 def forward(self, x):
-                    out, h = self.layer1(x)
-                    return self.layer3(self.layer2(out[:, -1]))
+                    return self.layer3(self.logits(x))
             self.model = Net(input_shape, n_classes)
 
+        # Keep references to the final activation function of the model and the layers before it, so that
+        # during training the activation can be applied (in fp32) separately from the other layers of the model
+        # (a tuple, rather than a new `nn.Sequential` for every forward pass, and not registered as a submodule)
+        self.final_activation = self.model[-1] if model_type == "dnn" else self.model.layer3
+        self.logit_layers = tuple(self.model)[:-1] if model_type == "dnn" else None
+
+        # Optionally compile the layers of the model used during training (requires Pytorch >= 2.0).
+        # `self.model` itself stays uncompiled so that checkpointing and exporting are unchanged.
+        # Only the DNN model is compiled, as torch.compile doesn't support the LSTM layers of the RNN model.
+        if compile_model and not hasattr(torch, "compile"):
+            logging.warning("Compiling the model requires Pytorch >= 2.0, it will not be compiled.")
+            compile_model = False
+        if compile_model and model_type != "dnn":
+            logging.warning(f"Compiling the '{model_type}' model is not supported, it will not be compiled.")
+        self.compiled_logits = torch.compile(self._logits, mode="max-autotune", fullgraph=True) \
+            if compile_model and model_type == "dnn" else None
+
         # Define metrics
         if n_classes == 1:
             self.fp = lambda pred, y: (y-pred <= -0.5).sum()
@@ -101,8 +126,12 @@ class Model(nn.Module):
         self.history = collections.defaultdict(list)
 
         # Define optimizer and loss
-        self.loss = torch.nn.functional.binary_cross_entropy if n_classes == 1 else nn.functional.cross_entropy
-        self.optimizer = optim.Adam(self.model.parameters(), lr=0.0001)
+        self.loss = torch.nn.functional.binary_cross_entropy_with_logits if n_classes == 1 else nn.functional.cross_entropy
+
+        # Use the fused Adam implementation on GPUs, which updates all of the parameters with a single kernel.
+        # The model is moved to the device first, as fused Adam requires the parameters to already be on the GPU.
+        self.model.to(self.device)
+        self.optimizer = optim.Adam(self.model.parameters(), lr=0.0001, fused=self.device.type == "cuda")
 
     def save_model(self, output_path):
         """
@@ -159,35 +188,49 @@ class Model(nn.Module):
         learning_rate = np.where(global_step < warmup_steps, warmup_lr, learning_rate)
         return learning_rate
 
+    def _logits(self, x):
+        """Gets the outputs of the model before its final activation function"""
+        if self.logit_layers is not None:
+            for layer in self.logit_layers:
+                x = layer(x)
+            return x
+        return self.model.logits(x)
+
+    def logits(self, x):
+        """Gets the outputs of the model before its final activation function, using the compiled model if available"""
+        if self.compiled_logits is not None:
+            return self.compiled_logits(x)
+        return self._logits(x)
+
     def forward(self, x):
-        return self.model(x)
+        return self.final_activation(self.logits(x))
 
     def summary(self):
         return torchinfo.summary(self.model, input_size=(1,) + self.input_shape)
 
     def average_models(self, models=None):
-        """Averages the weights of the provided models together to make a new model"""
+        """
+        Averages the weights of the provided models (or their state dicts, as stored
+        in `self.best_models`) together to make a new model
+        """
 
         if models is None:
             models = self.best_models
 
-        # Clone a model from the list as the base for the averaged model
-        averaged_model = copy.deepcopy(models[0])
-        averaged_model_dict = averaged_model.state_dict()
+        state_dicts = [model if isinstance(model, dict) else model.state_dict() for model in models]
 
-        # Initialize a running total of the weights
-        for key in averaged_model_dict:
-            averaged_model_dict[key] *= 0  # set to 0
+        # Sum the weights of all of the models on the CPU and divide by the number of models,
+        # using the foreach ops to update all of the tensors at once
+        averaged_model_dict = {key: torch.zeros_like(value, device="cpu") for key, value in state_dicts[0].items()}
+        averaged_weights = list(averaged_model_dict.values())
 
-        for model in models:
-            model_dict = model.state_dict()
-            for key, value in model_dict.items():
-                averaged_model_dict[key] += value
+        for state_dict in state_dicts:
+            torch._foreach_add_(averaged_weights, [value.cpu() for value in state_dict.values()])
 
-        for key in averaged_model_dict:
-            averaged_model_dict[key] /= len(models)
+        torch._foreach_div_(averaged_weights, len(models))
 
-        # Load the averaged weights into the model
+        # Clone the current model as the base for the averaged model and load the averaged weights into it
+        averaged_model = copy.deepcopy(self.model)
         averaged_model.load_state_dict(averaged_model_dict)
 
         return averaged_model
@@ -205,7 +248,7 @@ class Model(nn.Module):
         # Sequence 1
         logging.info("#"*50 + "\nStarting training sequence 1...\n" + "#"*50)
         lr = 0.0001
-        weights = np.linspace(1, max_negative_weight, int(steps)).tolist()
+        weights = np.linspace(1, max_negative_weight, int(steps), dtype=np.float32)
         val_steps = np.linspace(steps-int(steps*0.25), steps, 20).astype(np.int64)
         self.train_model(
                     X=X_train,
@@ -226,7 +269,7 @@ class Model(nn.Module):
             max_negative_weight = max_negative_weight*2
             logging.info("Increasing weight on negative examples to reduce false positives...")
 
-        weights = np.linspace(1, max_negative_weight, int(steps)).tolist()
+        weights = np.linspace(1, max_negative_weight, int(steps), dtype=np.float32)
         val_steps = np.linspace(1, steps, 20).astype(np.int16)
         self.train_model(
                     X=X_train,
@@ -246,7 +289,7 @@ class Model(nn.Module):
             max_negative_weight = max_negative_weight*2
             logging.info("Increasing weight on negative examples to reduce false positives...")
 
-        weights = np.linspace(1, max_negative_weight, int(steps)).tolist()
+        weights = np.linspace(1, max_negative_weight, int(steps), dtype=np.float32)
         val_steps = np.linspace(1, steps, 20).astype(np.int16)
         self.train_model(
                     X=X_train,
@@ -277,21 +320,18 @@ class Model(nn.Module):
             combined_model = self.model
 
         # Report validation metrics for combined model
-        with torch.no_grad():
-            for batch in X_val:
-                x, y = batch[0].to(self.device), batch[1].to(self.device)
-                val_ps = combined_model(x)
-
-            combined_model_recall = self.recall(val_ps, y[..., None]).detach().cpu().numpy()
-            combined_model_accuracy = self.accuracy(val_ps, y[..., None].to(torch.int64)).detach().cpu().numpy()
+        x_val, y_val = self._concatenate_batches(X_val)
+        with torch.inference_mode():
+            val_ps = combined_model(x_val)
+        combined_model_recall = self.recall(val_ps, y_val[..., None]).detach().cpu().numpy()
+        combined_model_accuracy = self.accuracy(val_ps, y_val[..., None].to(torch.int64)).detach().cpu().numpy()
 
-            combined_model_fp = 0
-            for batch in false_positive_val_data:
-                x_val, y_val = batch[0].to(self.device), batch[1].to(self.device)
-                val_ps = combined_model(x_val)
-                combined_model_fp += self.fp(val_ps, y_val[..., None])
+        x_val, y_val = self._concatenate_batches(false_positive_val_data)
+        with torch.inference_mode():
+            val_ps = combined_model(x_val)
+        combined_model_fp = self.fp(val_ps, y_val[..., None])
 
-            combined_model_fp_per_hr = (combined_model_fp/val_set_hrs).detach().cpu().numpy()
+        combined_model_fp_per_hr = (combined_model_fp/val_set_hrs).detach().cpu().numpy()
 
         logging.info(f"\n################\nFinal Model Accuracy: {combined_model_accuracy}"
                      f"\nFinal Model Recall: {combined_model_recall}\nFinal Model False Positives per Hour: {combined_model_fp_per_hr}"
@@ -313,94 +353,216 @@ class Model(nn.Module):
 
         return None
 
+    def _prefetch_to_device(self, data):
+        """
+        Iterates over the batches in the provided data, copying the next batch to the target (CUDA) device
+        on a separate stream while the current batch is being used.
+
+        Yields:
+            list: The tensors of each batch, on the target device
+        """
+        stream = torch.cuda.Stream(self.device)
+        staged = None
+        for batch in data:
+            # Start copying the next batch, and record when it finishes
+            with torch.cuda.stream(stream):
+                batch = [i.to(self.device, non_blocking=True) for i in batch]
+                copied = torch.cuda.Event()
+                copied.record(stream)
+
+            if staged is not None:
+                yield self._wait_for_batch(*staged)
+            staged = (batch, copied)
+
+        if staged is not None:
+            yield self._wait_for_batch(*staged)
+
+    def _wait_for_batch(self, batch, copied):
+        """Makes the current CUDA stream wait until a batch prefetched on another stream has been copied"""
+        current_stream = torch.cuda.current_stream(self.device)
+        current_stream.wait_event(copied)
+        for i in batch:
+            # Prevent the memory of the batch from being reused before the current stream is done with it
+            i.record_stream(current_stream)
+
+        return batch
+
+    def _concatenate_batches(self, data):
+        """
+        Concatenates all of the batches in the provided data into single feature and label tensors
+        on the target device, so that they only need to be loaded and transferred once. Each batch is
+        transferred as it is loaded (asynchronously, if the batches are in pinned memory) and the
+        batches are concatenated on the device.
+
+        Returns:
+            tuple: The features and labels for all of the batches
+        """
+        features = []
+        labels = []
+        for batch in data:
+            features.append(batch[0].to(self.device, non_blocking=True))
+            labels.append(batch[1].to(self.device, non_blocking=True))
+
+        return torch.cat(features).float(), torch.cat(labels)
+
+    def _log_step_metrics(self, step_metrics, start, end):
+        """
+        Copies the training metrics for steps `start` to `end` from the device buffers to the history.
+
+        Returns:
+            int: The index of the next step to log
+        """
+        for name, values in step_metrics.items():
+            self.history[name].extend(values[start:end].cpu().numpy())
+
+        return end
+
+    def _train_step(self, x, y, negative_weight):
+        """
+        Gets the predictions of the model for a batch, keeps only the examples with high loss,
+        and computes the weighted loss for them.
+
+        Returns:
+            tuple: The predictions, labels, and float labels (with an extra dimension) of the high loss examples,
+                   and the loss
+        """
+        # Get predictions for batch, using bf16 mixed precision on supported GPUs. Only the layers before
+        # the final activation function run under autocast, and the activation and loss are computed from fp32 logits,
+        # as in bf16 the sigmoid of confident predictions rounds to exactly 0 or 1 (and the loss saturates).
+        with torch.autocast(device_type=self.device.type, dtype=torch.bfloat16, enabled=self.use_bf16):
+            logits = self.logits(x)
+        logits = logits.float()
+        predictions = self.final_activation(logits)
+
+        # Construct batch with only samples that have high loss
+        # (binary predictions are flattened with a view, as squeezing would also drop the batch dimension for a batch size of 1)
+        flat_predictions = predictions.view(-1) if self.n_classes == 1 else predictions
+        high_loss = ((y == 0) & (flat_predictions >= 0.001)) | \
+                    ((y == 1) & (flat_predictions < 0.999))  # thresholds were chosen arbitrarily but work well
+        y = y[high_loss]
+        y_ = y[..., None].to(torch.float32)
+        predictions = predictions[high_loss]
+
+        # Set weights for batch
+        w = torch.where(y == 1, 1.0, negative_weight)[..., None]
+
+        # (binary cross-entropy is computed from the logits, which is also more numerically stable)
+        loss = self.loss(logits[high_loss], y_, w) if self.n_classes == 1 else self.loss(predictions, y, w)
+        return predictions, y, y_, loss
+
     def train_model(self, X, max_steps, warmup_steps, hold_steps, X_val=None,
                     false_positive_val_data=None,
                     negative_weight_schedule=[1],
-                    val_steps=[250], lr=0.0001, val_set_hrs=1):
-        # Move models and main class to target device
+                    val_steps=[250], lr=0.0001, val_set_hrs=1, compile_step=False):
+        """
+        Trains the model on batches from `X` for `max_steps` steps, periodically
+        evaluating the model on the validation data and saving the best checkpoints.
+
+        Args:
+            compile_step (bool): Whether to compile the forward pass, high loss example selection, and
+                                 loss computation of each step with `torch.compile`. Can reduce the overhead
+                                 of the many small operations per step, but the first steps are slower
+                                 while compiling. Requires Pytorch >= 2.0.
+        """
+        # Move models and main class (including the metrics, which are submodules) to target device
         self.to(self.device)
         self.model.to(self.device)
 
-        # Train model
-        accumulation_steps = 1
+        # Compile the training step, if requested
+        if compile_step and not hasattr(torch, "compile"):
+            logging.warning("Compiling the training step requires Pytorch >= 2.0, it will not be compiled.")
+            compile_step = False
+        train_step = torch.compile(self._train_step, dynamic=True) if compile_step else self._train_step
+
+        # Precompute the learning rate schedule for all steps
+        lr_schedule = self.lr_warmup_cosine_decay(np.arange(max_steps), warmup_steps=warmup_steps, hold=hold_steps,
+                                                  total_steps=max_steps, target_lr=lr).tolist()
+
+        # Move the negative weight schedule to the target device
+        negative_weights = torch.as_tensor(negative_weight_schedule, dtype=torch.float32, device=self.device)
+
+        # Use a set for the validation steps, as they are checked at every step
+        val_steps = set(int(i) for i in val_steps)
+
+        # Load the validation data onto the target device once, rather than at every validation step
+        if false_positive_val_data is not None:
+            fp_val_x, fp_val_y = self._concatenate_batches(false_positive_val_data)
+            fp_val_y = fp_val_y[..., None]
+        if X_val is not None:
+            val_x, val_y = self._concatenate_batches(X_val)
+            val_y = val_y[..., None]
+            val_y_int = val_y.to(torch.int64)
+
+        # Preallocate buffers on the target device for the training metrics of each step,
+        # so that they can be copied to the history in bulk rather than after every step
+        metric_names = ["loss", "recall"] if self.n_classes == 1 else ["loss", "recall", "accuracy"]
+        step_metrics = {name: torch.empty(int(max_steps), device=self.device) for name in metric_names}
+        n_logged = 0
+
+        # Copy the training batches to the GPU ahead of time, if training on a GPU
+        if self.device.type == "cuda":
+            X = self._prefetch_to_device(X)
+
+        # Train model (clearing any gradients accumulated, but not yet used, by a previous call)
         accumulated_samples = 0
+        self.optimizer.zero_grad(set_to_none=True)
+        n_steps = 0  # the number of completed steps, for logging the remaining metrics after training
         for step_ndx, data in tqdm(enumerate(X, 0), total=max_steps, desc="Training"):
             # get the inputs; data is a list of [inputs, labels]
-            x, y = data[0].to(self.device), data[1].to(self.device)
-            y_ = y[..., None].to(torch.float32)
+            # (features may be stored at a lower precision, so are converted to float32 on the device)
+            x, y = data[0].to(self.device, non_blocking=True).float(), data[1].to(self.device, non_blocking=True)
 
             # Update learning rates
             for g in self.optimizer.param_groups:
-                g['lr'] = self.lr_warmup_cosine_decay(step_ndx, warmup_steps=warmup_steps, hold=hold_steps,
-                                                      total_steps=max_steps, target_lr=lr)
-
-            # zero the parameter gradients
-            self.optimizer.zero_grad()
-
-            # Get predictions for batch
-            predictions = self.model(x)
-
-            # Construct batch with only samples that have high loss
-            neg_high_loss = predictions[(y == 0) & (predictions.squeeze() >= 0.001)]  # thresholds were chosen arbitrarily but work well
-            pos_high_loss = predictions[(y == 1) & (predictions.squeeze() < 0.999)]
-            y = torch.cat((y[(y == 0) & (predictions.squeeze() >= 0.001)], y[(y == 1) & (predictions.squeeze() < 0.999)]))
-            y_ = y[..., None].to(torch.float32)
-            predictions = torch.cat((neg_high_loss, pos_high_loss))
-
-            # Set weights for batch
-            if len(negative_weight_schedule) == 1:
-                w = torch.ones(y.shape[0])*negative_weight_schedule[0]
-                pos_ndcs = y == 1
-                w[pos_ndcs] = 1
-                w = w[..., None]
-            else:
-                if self.n_classes == 1:
-                    w = torch.ones(y.shape[0])*negative_weight_schedule[step_ndx]
-                    pos_ndcs = y == 1
-                    w[pos_ndcs] = 1
-                    w = w[..., None]
-
-            # Do backpropagation, with gradient accumulation if the batch-size after selecting high loss examples is too small
-            loss = self.loss(predictions, y_ if self.n_classes == 1 else y, w.to(self.device))
-            loss = loss/accumulation_steps
-            accumulated_samples += predictions.shape[0]
-            if accumulated_samples < 128:
-                accumulation_steps += 1
-            else:
-                loss.backward()
+                g['lr'] = lr_schedule[step_ndx]
+
+            # Get predictions and loss for the high loss examples in the batch
+            negative_weight = negative_weights[0] if len(negative_weights) == 1 else negative_weights[step_ndx]
+            predictions, y, y_, loss = train_step(x, y, negative_weight)
+
+            # Do backpropagation, with gradient accumulation if the batch-size after selecting high loss examples is too small.
+            # The (mean) loss of each batch is weighted by its number of examples, and the accumulated gradients are
+            # divided by the total number of examples before updating, so that every example contributes equally.
+            n_samples = predictions.shape[0]
+            accumulated_samples += n_samples
+            if n_samples != 0:
+                (loss*n_samples).backward()
+
+            if accumulated_samples >= 128:
+                torch._foreach_div_([p.grad for p in self.model.parameters() if p.grad is not None], accumulated_samples)
                 self.optimizer.step()
-                accumulation_steps = 1
                 accumulated_samples = 0
 
+                # zero the parameter gradients
+                self.optimizer.zero_grad(set_to_none=True)
+
             # Compute training metrics and log them
             fp = self.fp(predictions, y_ if self.n_classes == 1 else y)
             self.n_fp += fp
 
-            self.history["loss"].append(loss.detach().cpu().numpy())
-            self.history["recall"].append(self.recall(predictions, y_).detach().cpu().numpy())
+            step_metrics["loss"][step_ndx] = loss.detach()
+            step_metrics["recall"][step_ndx] = self.recall(predictions, y_).detach()
             if self.n_classes != 1:
-                self.history["accuracy"].append(self.acc(predictions, y).detach().cpu().numpy())
+                step_metrics["accuracy"][step_ndx] = self.acc(predictions, y).detach()
 
             # Run validation and log validation metrics
+            if step_ndx in val_steps and step_ndx > 1:
+                n_logged = self._log_step_metrics(step_metrics, n_logged, step_ndx + 1)
+
             if step_ndx in val_steps and step_ndx > 1 and false_positive_val_data is not None:
                 # Get false positives per hour with false positive data
-                val_fp = 0
-                for val_step_ndx, data in enumerate(false_positive_val_data):
-                    with torch.no_grad():
-                        x_val, y_val = data[0].to(self.device), data[1].to(self.device)
-                        val_predictions = self.model(x_val)
-                        val_fp += self.fp(val_predictions, y_val[..., None])
+                with torch.inference_mode():
+                    val_predictions = self.model(fp_val_x)
+                val_fp = self.fp(val_predictions, fp_val_y)
                 val_fp_per_hr = (val_fp/val_set_hrs).detach().cpu().numpy()
                 self.history["val_fp_per_hr"].append(val_fp_per_hr)
 
             if step_ndx in val_steps and step_ndx > 1 and X_val is not None:
                 # Get accuracy for balanced test examples of positive and negative clips
-                for val_step_ndx, data in enumerate(X_val):
-                    with torch.no_grad():
-                        x_val, y_val = data[0].to(self.device), data[1].to(self.device)
-                        val_predictions = self.model(x_val)
-                        val_recall = self.recall(val_predictions, y_val[..., None]).detach().cpu().numpy()
-                        val_acc = self.accuracy(val_predictions, y_val[..., None].to(torch.int64))
+                with torch.inference_mode():
+                    val_predictions = self.model(val_x)
+                val_recall = self.recall(val_predictions, val_y).detach().cpu().numpy()
+                val_acc = self.accuracy(val_predictions, val_y_int)
                 self.history["val_accuracy"].append(val_acc.detach().cpu().numpy())
                 self.history["val_recall"].append(val_recall)
 
@@ -410,16 +572,19 @@ class Model(nn.Module):
                         self.history["val_accuracy"][-1] >= np.percentile(self.history["val_accuracy"], 90) and \
                         self.history["val_recall"][-1] >= np.percentile(self.history["val_recall"], 90):
                     # logging.info("Saving checkpoint with metrics >= to targets!")
-                    self.best_models.append(copy.deepcopy(self.model))
+                    self.best_models.append({key: value.detach().cpu().clone() for key, value in self.model.state_dict().items()})
                     self.best_model_scores.append({"val_fp_per_hr": val_fp_per_hr, "val_accuracy": self.history["val_accuracy"][-1],
                                                    "val_recall": self.history["val_recall"][-1]})
                     self.best_val_fp = val_fp_per_hr
                     self.best_val_recall = self.history["val_recall"][-1]
                     self.best_val_accuracy = self.history["val_accuracy"][-1]
 
+            n_steps = step_ndx + 1
             if step_ndx == max_steps-1:
                 break
 
+        self._log_step_metrics(step_metrics, n_logged, n_steps)
+
 
 # Separate function to convert onnx models to tflite format
 def convert_onnx_to_tflite(onnx_model_path, output_path):
@@ -605,24 +770,28 @@ if __name__ == '__main__':
     if args.augment_clips is True:
         if not os.path.exists(os.path.join(feature_save_dir, "positive_features_train.npy")) or args.overwrite is True:
             positive_clips_train = [str(i) for i in Path(positive_train_output_dir).glob("*.wav")]*config["augmentation_rounds"]
+            n_positive_train = len(positive_clips_train)//config["augmentation_rounds"]
             positive_clips_train_generator = augment_clips(positive_clips_train, total_length=config["total_length"],
                                                            batch_size=config["augmentation_batch_size"],
                                                            background_clip_paths=background_paths,
                                                            RIR_paths=rir_paths)
 
             positive_clips_test = [str(i) for i in Path(positive_test_output_dir).glob("*.wav")]*config["augmentation_rounds"]
+            n_positive_test = len(positive_clips_test)//config["augmentation_rounds"]
             positive_clips_test_generator = augment_clips(positive_clips_test, total_length=config["total_length"],
                                                           batch_size=config["augmentation_batch_size"],
                                                           background_clip_paths=background_paths,
                                                           RIR_paths=rir_paths)
 
             negative_clips_train = [str(i) for i in Path(negative_train_output_dir).glob("*.wav")]*config["augmentation_rounds"]
+            n_negative_train = len(negative_clips_train)//config["augmentation_rounds"]
             negative_clips_train_generator = augment_clips(negative_clips_train, total_length=config["total_length"],
                                                            batch_size=config["augmentation_batch_size"],
                                                            background_clip_paths=background_paths,
                                                            RIR_paths=rir_paths)
 
             negative_clips_test = [str(i) for i in Path(negative_test_output_dir).glob("*.wav")]*config["augmentation_rounds"]
+            n_negative_test = len(negative_clips_test)//config["augmentation_rounds"]
             negative_clips_test_generator = augment_clips(negative_clips_test, total_length=config["total_length"],
                                                           batch_size=config["augmentation_batch_size"],
                                                           background_clip_paths=background_paths,
@@ -630,63 +799,51 @@ if __name__ == '__main__':
 
             # Compute features and save to disk via memmapped arrays
             logging.info("#"*50 + "\nComputing openwakeword features for generated samples\n" + "#"*50)
-            n_cpus = os.cpu_count()
-            if n_cpus is None:
-                n_cpus = 1
-            else:
-                n_cpus = n_cpus//2
-            compute_features_from_generator(positive_clips_train_generator, n_total=len(os.listdir(positive_train_output_dir)),
+            # The four feature sets are independent, so two are computed at a time to overlap the data augmentation
+            # of one set with the feature computation of another. Threads are used since the generators can't be
+            # pickled and both augmentation (Pytorch) and feature computation (onnxruntime) release the GIL.
+            # (`ncpu` is always passed, as it only takes effect if the feature models end up running on the CPU,
+            # which can also happen with a GPU available if onnxruntime doesn't support CUDA. It is split between
+            # the two concurrent jobs to keep using about half of the cores in total.)
+            n_cpus = max(1, (os.cpu_count() or 1)//4)
+            feature_jobs = [
+                (positive_clips_train_generator, n_positive_train, "positive_features_train.npy"),
+                (negative_clips_train_generator, n_negative_train, "negative_features_train.npy"),
+                (positive_clips_test_generator, n_positive_test, "positive_features_test.npy"),
+                (negative_clips_test_generator, n_negative_test, "negative_features_test.npy"),
+            ]
+            with ThreadPoolExecutor(max_workers=2) as feature_executor:
+                futures = [
+                    feature_executor.submit(compute_features_from_generator, generator, n_total=n_total,
                                             clip_duration=config["total_length"],
-                                            output_file=os.path.join(feature_save_dir, "positive_features_train.npy"),
+                                            output_file=os.path.join(feature_save_dir, output_file),
                                             device="gpu" if torch.cuda.is_available() else "cpu",
-                                            ncpu=n_cpus if not torch.cuda.is_available() else 1)
-
-            compute_features_from_generator(negative_clips_train_generator, n_total=len(os.listdir(negative_train_output_dir)),
-                                            clip_duration=config["total_length"],
-                                            output_file=os.path.join(feature_save_dir, "negative_features_train.npy"),
-                                            device="gpu" if torch.cuda.is_available() else "cpu",
-                                            ncpu=n_cpus if not torch.cuda.is_available() else 1)
-
-            compute_features_from_generator(positive_clips_test_generator, n_total=len(os.listdir(positive_test_output_dir)),
-                                            clip_duration=config["total_length"],
-                                            output_file=os.path.join(feature_save_dir, "positive_features_test.npy"),
-                                            device="gpu" if torch.cuda.is_available() else "cpu",
-                                            ncpu=n_cpus if not torch.cuda.is_available() else 1)
-
-            compute_features_from_generator(negative_clips_test_generator, n_total=len(os.listdir(negative_test_output_dir)),
-                                            clip_duration=config["total_length"],
-                                            output_file=os.path.join(feature_save_dir, "negative_features_test.npy"),
-                                            device="gpu" if torch.cuda.is_available() else "cpu",
-                                            ncpu=n_cpus if not torch.cuda.is_available() else 1)
+                                            ncpu=n_cpus, dtype=np.float16)
+                    for generator, n_total, output_file in feature_jobs
+                ]
+                for future in futures:
+                    future.result()  # re-raise any exceptions from the feature computation
         else:
             logging.warning("Openwakeword features already exist, skipping data augmentation and feature generation")
 
     # Create openwakeword model
     if args.train_model is True:
-        F = openwakeword.utils.AudioFeatures(device='cpu')
-        input_shape = F.get_embedding_shape(config["total_length"]//16000)  # training data is always 16 khz
+        input_shape = openwakeword.utils.compute_embedding_shape(config["total_length"]//16000)  # training data is always 16 khz
 
+        # The input shape is fixed for the whole training run, so on GPUs the DNN model is compiled
+        # (when supported by the installed version of Pytorch) to fuse its many small kernels
         oww = Model(n_classes=1, input_shape=input_shape, model_type=config["model_type"],
-                    layer_dim=config["layer_size"], seconds_per_example=1280*input_shape[0]/16000)
-
-        # Create data transform function for batch generation to handle differ clip lengths (todo: write tests for this)
-        def f(x, n=16):
-            """Simple transformation function to ensure negative data is the appropriate shape for the model size"""
-            if n > x.shape[1] or n < x.shape[1]:
-                x = np.vstack(x)
-                new_batch = np.array([x[i:i+n, :] for i in range(0, x.shape[0]-n, n)])
-            else:
-                return x
-            return new_batch
+                    layer_dim=config["layer_size"], seconds_per_example=1280*input_shape[0]/16000,
+                    compile_model=(config["model_type"] == "dnn" and hasattr(torch, "compile")
+                                   and torch.cuda.is_available()))
 
         # Create label transforms as needed for model (currently only supports binary classification models)
-        data_transforms = {key: f for key in config["feature_data_files"].keys()}
         label_transforms = {}
         for key in ["positive"] + list(config["feature_data_files"].keys()) + ["adversarial_negative"]:
             if key == "positive":
-                label_transforms[key] = lambda x: [1 for i in x]
+                label_transforms[key] = lambda x: np.ones(len(x), dtype=np.float32)
             else:
-                label_transforms[key] = lambda x: [0 for i in x]
+                label_transforms[key] = lambda x: np.zeros(len(x), dtype=np.float32)
 
         # Add generated positive and adversarial negative clips to the feature data files dictionary
         config["feature_data_files"]['positive'] = os.path.join(feature_save_dir, "positive_features_train.npy")
@@ -696,43 +853,52 @@ if __name__ == '__main__':
         batch_generator = mmap_batch_generator(
             config["feature_data_files"],
             n_per_class=config["batch_n_per_class"],
-            data_transform_funcs=data_transforms,
-            label_transform_funcs=label_transforms
+            label_transform_funcs=label_transforms,
+            n_frames=input_shape[0]  # split examples with different clip lengths to the appropriate shape for the model
         )
 
         class IterDataset(torch.utils.data.IterableDataset):
             def __init__(self, generator):
                 self.generator = generator
+                self.sharded = False
 
             def __iter__(self):
+                # Give each worker process its own part of the data, only once as the (persistent)
+                # workers continue from where they left off for each training sequence
+                worker_info = torch.utils.data.get_worker_info()
+                if worker_info is not None and not self.sharded:
+                    self.generator.set_shard(worker_info.id, worker_info.num_workers)
+                    self.sharded = True
                 return self.generator
 
-        n_cpus = os.cpu_count()
-        if n_cpus is None:
-            n_cpus = 1
-        else:
-            n_cpus = n_cpus//2
+        # Batches are only sliced from mmaped arrays, so a couple of workers can keep up with training
+        # (more workers and deeper prefetching just add inter-process overhead and memory usage)
         X_train = torch.utils.data.DataLoader(IterDataset(batch_generator),
-                                              batch_size=None, num_workers=n_cpus, prefetch_factor=16)
-
-        X_val_fp = np.load(config["false_positive_validation_data_path"])
-        X_val_fp = np.array([X_val_fp[i:i+input_shape[0]] for i in range(0, X_val_fp.shape[0]-input_shape[0], 1)])  # reshape to match model
-        X_val_fp_labels = np.zeros(X_val_fp.shape[0]).astype(np.float32)
+                                              batch_size=None, num_workers=2, prefetch_factor=2,
+                                              persistent_workers=True, pin_memory=torch.cuda.is_available())
+
+        # Make data loaders for the validation data. These are loaded onto the training device once per
+        # training sequence, in pinned batches so that the transfer of each batch overlaps with loading the next.
+        # Memory-map the false positive validation features (copy-on-write, like the test features below)
+        # and reshape to match the model with a (zero-copy) view of overlapping windows of frames
+        X_val_fp = np.load(config["false_positive_validation_data_path"], mmap_mode='c')
+        X_val_fp = torch.from_numpy(X_val_fp).unfold(0, input_shape[0], 1).transpose(1, 2)[:-1]
         X_val_fp = torch.utils.data.DataLoader(
-            torch.utils.data.TensorDataset(torch.from_numpy(X_val_fp), torch.from_numpy(X_val_fp_labels)),
-            batch_size=len(X_val_fp_labels)
+            torch.utils.data.TensorDataset(X_val_fp, torch.zeros(X_val_fp.shape[0])),
+            batch_size=4096, pin_memory=torch.cuda.is_available()
         )
 
-        X_val_pos = np.load(os.path.join(feature_save_dir, "positive_features_test.npy"))
-        X_val_neg = np.load(os.path.join(feature_save_dir, "negative_features_test.npy"))
-        labels = np.hstack((np.ones(X_val_pos.shape[0]), np.zeros(X_val_neg.shape[0]))).astype(np.float32)
-
-        X_val = torch.utils.data.DataLoader(
-            torch.utils.data.TensorDataset(
-                torch.from_numpy(np.vstack((X_val_pos, X_val_neg))),
-                torch.from_numpy(labels)
-                ),
-            batch_size=len(labels)
+        # Memory-map the positive and negative test features (copy-on-write, so that the arrays are writable
+        # as Pytorch expects) and combine them as datasets, rather than loading and stacking them in memory
+        X_val_pos = np.load(os.path.join(feature_save_dir, "positive_features_test.npy"), mmap_mode='c')
+        X_val_neg = np.load(os.path.join(feature_save_dir, "negative_features_test.npy"), mmap_mode='c')
+
+        X_val: torch.utils.data.DataLoader = torch.utils.data.DataLoader(
+            torch.utils.data.ConcatDataset([
+                torch.utils.data.TensorDataset(torch.from_numpy(X_val_pos), torch.ones(X_val_pos.shape[0])),
+                torch.utils.data.TensorDataset(torch.from_numpy(X_val_neg), torch.zeros(X_val_neg.shape[0]))
+            ]),
+            batch_size=4096, pin_memory=torch.cuda.is_available()
         )
 
         # Run auto training
@@ -748,6 +914,9 @@ if __name__ == '__main__':
         # Export the trained model to onnx
         oww.export_model(model=best_model, model_name=config["model_name"], output_dir=config["output_dir"])
 
-        # Convert the model from onnx to tflite format
-        convert_onnx_to_tflite(os.path.join(config["output_dir"], config["model_name"] + ".onnx"),
-                               os.path.join(config["output_dir"], config["model_name"] + ".tflite"))
+        # Convert the model from onnx to tflite format in a separate process, so that Tensorflow
+        # isn't imported into (and doesn't claim GPU memory alongside Pytorch in) the training process
+        with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as executor:
+            executor.submit(convert_onnx_to_tflite,
+                            os.path.join(config["output_dir"], config["model_name"] + ".onnx"),
+                            os.path.join(config["output_dir"], config["model_name"] + ".tflite")).result()
@@ -17,6 +17,7 @@ import os
 import numpy as np
 import pathlib
 from collections import deque
+from itertools import islice
 from multiprocessing.pool import ThreadPool
 from multiprocessing import Process, Queue
 import time
@@ -24,8 +25,7 @@ import logging
 from tqdm import tqdm
 import openwakeword
 from numpy.lib.format import open_memmap
-from typing import Union, List, Callable, Deque
-import requests
+from typing import Any, Union, List, Callable, Deque
 
 
 # Base class for computing audio features using Google's speech_embedding
@@ -41,7 +41,8 @@ class AudioFeatures():
                  sr: int = 16000,
                  ncpu: int = 1,
                  inference_framework: str = "onnx",
-                 device: str = 'cpu'
+                 device: str = 'cpu',
+                 fuse_models: bool = False
                  ):
         """
         Initialize the AudioFeatures object.
@@ -59,8 +60,13 @@ class AudioFeatures():
                           Note that depending on the inference framework selected and system configuration,
                           this setting may not have an effect. For example, to use a GPU with the ONNX
                           framework the appropriate onnxruntime package must be installed.
+            fuse_models (bool): Whether to also merge the melspectrogram and embedding models into a single ONNX graph,
+                                which is used to compute the features for each new frame (1280 samples) of streaming
+                                audio with one call to onnxruntime. Only used with the "onnx" inference framework,
+                                and requires the `onnx` package (`pip install onnx`).
         """
         # Initialize the models with the appropriate framework
+        self.fused_feature_model: Any = None
         if inference_framework == "onnx":
             try:
                 import onnxruntime as ort
@@ -92,6 +98,15 @@ class AudioFeatures():
                                                         else ["CPUExecutionProvider"])
             self.embedding_model_predict = lambda x: self.embedding_model.run(None, {'input_1': x})[0].squeeze()
 
+            # Merged melspectrogram and embedding model for streaming audio
+            if fuse_models:
+                fused_feature_model = _fuse_feature_models(melspec_model_path, embedding_model_path)
+                if fused_feature_model is not None:
+                    self.fused_feature_model = ort.InferenceSession(
+                        fused_feature_model, sess_options=sessionOptions,
+                        providers=["CUDAExecutionProvider"] if device == "gpu" else ["CPUExecutionProvider"]
+                    )
+
         elif inference_framework == "tflite":
             try:
                 import tflite_runtime.interpreter as tflite
@@ -390,6 +405,22 @@ class AudioFeatures():
         if self.melspectrogram_buffer.shape[0] > self.melspectrogram_max_len:
             self.melspectrogram_buffer = self.melspectrogram_buffer[-self.melspectrogram_max_len:, :]
 
+    def _streaming_fused_features(self):
+        """
+        Computes the melspectrogram and audio features for the most recent frame (1280 samples) of audio data
+        with a single call to the merged melspectrogram and embedding model.
+        """
+        melspec, embedding = self.fused_feature_model.run(None, {
+            "audio": np.array(list(islice(reversed(self.raw_data_buffer), 1280+160*3))[::-1], dtype=np.float32)[None, ],
+            "melspectrogram_history": self.melspectrogram_buffer[-76:].astype(np.float32)
+        })
+
+        self.melspectrogram_buffer = np.vstack((self.melspectrogram_buffer, melspec))
+        if self.melspectrogram_buffer.shape[0] > self.melspectrogram_max_len:
+            self.melspectrogram_buffer = self.melspectrogram_buffer[-self.melspectrogram_max_len:, :]
+
+        self.feature_buffer = np.vstack((self.feature_buffer, embedding.squeeze()))
+
     def _buffer_raw_data(self, x):
         """
         Adds raw audio data to the input buffer
@@ -419,8 +450,14 @@ class AudioFeatures():
             self.accumulated_samples += x.shape[0]
             self._buffer_raw_data(x)
 
+        # Calculate melspectrogram and audio features for a single new frame with the merged model, if available
+        if self.accumulated_samples == 1280 and self.fused_feature_model is not None:
+            self._streaming_fused_features()
+            processed_samples = self.accumulated_samples
+            self.accumulated_samples = 0
+
         # Only calculate melspectrogram once minimum samples are accumulated
-        if self.accumulated_samples >= 1280 and self.accumulated_samples % 1280 == 0:
+        elif self.accumulated_samples >= 1280 and self.accumulated_samples % 1280 == 0:
             self._streaming_melspectrogram(self.accumulated_samples)
 
             # Calculate new audio embeddings/features based on update melspectrograms
@@ -441,18 +478,102 @@ class AudioFeatures():
 
         return processed_samples if processed_samples != 0 else self.accumulated_samples
 
-    def get_features(self, n_feature_frames: int = 16, start_ndx: int = -1):
+    def _get_feature_frames(self, n_feature_frames: int = 16, start_ndx: int = -1):
         if start_ndx != -1:
             end_ndx = start_ndx + int(n_feature_frames) \
                 if start_ndx + n_feature_frames != 0 else len(self.feature_buffer)
-            return self.feature_buffer[start_ndx:end_ndx, :][None, ].astype(np.float32)
+            return self.feature_buffer[start_ndx:end_ndx, :]
         else:
-            return self.feature_buffer[int(-1*n_feature_frames):, :][None, ].astype(np.float32)
+            return self.feature_buffer[int(-1*n_feature_frames):, :]
+
+    def get_features(self, n_feature_frames: int = 16, start_ndx: int = -1):
+        return self._get_feature_frames(n_feature_frames, start_ndx)[None, ].astype(np.float32)
+
+    def get_features_into(self, out: np.ndarray, start_ndx: int = -1):
+        """
+        Copies features from the feature buffer into a preallocated array, instead of creating a new array
+        like `get_features`. The number of feature frames is determined by the shape of the array.
+
+        Args:
+            out (ndarray): The array to copy the features into, with shape (1, n_feature_frames, 96)
+            start_ndx (int): The index of the first feature frame to copy (default: the most recent frames)
+
+        Returns:
+            ndarray: The `out` array
+        """
+        np.copyto(out[0], self._get_feature_frames(out.shape[1], start_ndx))
+        return out
 
     def __call__(self, x):
         return self._streaming_features(x)
 
 
+def _fuse_feature_models(melspec_model_path: str, embedding_model_path: str):
+    """
+    Merges the ONNX melspectrogram and embedding models into a single graph for streaming audio. The graph takes
+    the raw audio data and the previous melspectrogram frames as inputs, and returns the new melspectrogram frames
+    (with the same transform as `AudioFeatures._get_melspectrogram`) and the audio embedding of the most recent
+    76 melspectrogram frames.
+
+    Args:
+        melspec_model_path (str): The path to the ONNX melspectrogram model
+        embedding_model_path (str): The path to the ONNX embedding model
+
+    Returns:
+        bytes: The serialized merged model, or None if the models could not be merged
+    """
+    try:
+        import onnx
+        from onnx import helper, numpy_helper
+    except ImportError:
+        raise ValueError("Tried to import onnx to merge the models, but it was not found. Please install it using `pip install onnx`")
+
+    melspec_model = onnx.compose.add_prefix(onnx.load(melspec_model_path), prefix="melspectrogram/")
+    embedding_model = onnx.compose.add_prefix(onnx.load(embedding_model_path), prefix="embedding/")
+    opsets = [{opset.domain: opset.version for opset in mdl.opset_import} for mdl in [melspec_model, embedding_model]]
+    if opsets[0] != opsets[1]:
+        logging.warning("The melspectrogram and embedding models use different ONNX opset versions and can't be merged, "
+                        "using the separate models instead.")
+        return None
+
+    nodes = [
+        helper.make_node("Identity", ["audio"], [melspec_model.graph.input[0].name]),
+        *melspec_model.graph.node,
+        helper.make_node("Reshape", [melspec_model.graph.output[0].name, "melspectrogram_shape"], ["melspectrogram_raw"]),
+        helper.make_node("Div", ["melspectrogram_raw", "melspectrogram_scale"], ["melspectrogram_scaled"]),
+        helper.make_node("Add", ["melspectrogram_scaled", "melspectrogram_offset"], ["melspectrogram"]),
+        helper.make_node("Concat", ["melspectrogram_history", "melspectrogram"], ["melspectrogram_all"], axis=0),
+        helper.make_node("Slice", ["melspectrogram_all", "window_start", "window_end", "window_axes"], ["window"]),
+        helper.make_node("Reshape", ["window", "embedding_input_shape"], [embedding_model.graph.input[0].name]),
+        *embedding_model.graph.node,
+        helper.make_node("Identity", [embedding_model.graph.output[0].name], ["embedding"]),
+    ]
+    initializers = [
+        *melspec_model.graph.initializer,
+        *embedding_model.graph.initializer,
+        numpy_helper.from_array(np.array([-1, 32], dtype=np.int64), "melspectrogram_shape"),
+        numpy_helper.from_array(np.array(10, dtype=np.float32), "melspectrogram_scale"),
+        numpy_helper.from_array(np.array(2, dtype=np.float32), "melspectrogram_offset"),
+        numpy_helper.from_array(np.array([-76], dtype=np.int64), "window_start"),
+        numpy_helper.from_array(np.array([np.iinfo(np.int64).max], dtype=np.int64), "window_end"),
+        numpy_helper.from_array(np.array([0], dtype=np.int64), "window_axes"),
+        numpy_helper.from_array(np.array([1, 76, 32, 1], dtype=np.int64), "embedding_input_shape"),
+    ]
+    graph = helper.make_graph(
+        nodes, "openwakeword_fused_features",
+        [helper.make_tensor_value_info("audio", onnx.TensorProto.FLOAT, [1, "samples"]),
+         helper.make_tensor_value_info("melspectrogram_history", onnx.TensorProto.FLOAT, ["frames", 32])],
+        [helper.make_tensor_value_info("melspectrogram", onnx.TensorProto.FLOAT, ["new_frames", 32]),
+         helper.make_tensor_value_info("embedding", onnx.TensorProto.FLOAT, None)],
+        initializer=initializers,
+        value_info=[*melspec_model.graph.value_info, *embedding_model.graph.value_info]
+    )
+    fused_model = helper.make_model(graph, opset_imports=melspec_model.opset_import)
+    fused_model.ir_version = max(melspec_model.ir_version, embedding_model.ir_version)
+
+    return fused_model.SerializeToString()
+
+
 # Bulk prediction function
 def bulk_predict(
                  file_paths: List[str],
@@ -529,10 +650,31 @@ def bulk_predict(
     return {list(i.keys())[0]: list(i.values())[0] for i in results}
 
 
-def compute_features_from_generator(generator, n_total, clip_duration, output_file, device="cpu", ncpu=1):
+def compute_embedding_shape(audio_length: float, sr: int = 16000):
+    """
+    Determines the size of the output embedding array for a given audio clip length (in seconds), like
+    `AudioFeatures.get_embedding_shape`, but without loading the feature models.
+
+    Args:
+        audio_length (float): The length of the audio clip (in seconds)
+        sr (int): The sample rate of the audio clip
+
+    Returns:
+        tuple: The shape of the embedding array, as (frames, embedding_dim)
+    """
+    # The melspectrogram model produces one frame per 10 ms, and the embedding model is applied to
+    # windows of 76 melspectrogram frames with a step of 8 frames (see `AudioFeatures._get_embeddings`)
+    n_melspectrogram_frames = int(np.ceil(int(audio_length*sr)/160 - 3))
+    n_embedding_frames = max(0, (n_melspectrogram_frames - 76)//8 + 1)
+    return (n_embedding_frames, 96)
+
+
+def compute_features_from_generator(generator, n_total, clip_duration, output_file, device="cpu", ncpu=1,
+                                    batch_size=None, dtype=np.float32):
     """
     Computes audio features from a generator that produces Numpy arrays of shape (batch_size, samples)
-    containing 16-bit PCM audio data.
+    containing 16-bit PCM audio data. The next batch of audio data is pulled from the generator
+    in a background thread while the features for the current batch are computed.
 
     Args:
         generator (Generator): The generator that process the arrays of audio data
@@ -545,6 +687,11 @@ def compute_features_from_generator(generator, n_total, clip_duration, output_fi
                            than the available system memory.
         device (str): The device ("cpu" or "gpu") to use for computing features.
         ncpu (int): The number of cores to use when process the audio features (if computing on CPU)
+        batch_size (int): The batch size to use when computing the features. By default, the
+                          batch size of the arrays produced by the generator is used.
+        dtype (np.dtype): The data type of the features stored in the output file. Using np.float16
+                          halves the size of the file (and the I/O when training from it), at the
+                          cost of some precision.
 
     Returns:
         None
@@ -558,34 +705,36 @@ def compute_features_from_generator(generator, n_total, clip_duration, output_fi
     # Determine the output shape and create output file
     n_feature_cols = F.get_embedding_shape(clip_duration/16000)
     output_shape = (n_total, n_feature_cols[0], n_feature_cols[1])
-    fp = open_memmap(output_file, mode='w+', dtype=np.float32, shape=output_shape)
+    fp = open_memmap(output_file, mode='w+', dtype=dtype, shape=output_shape)
 
-    # Get batch size by pulling one value from the generator and store features
+    # Get batch size by pulling one value from the generator
     row_counter = 0
     audio_data = next(generator)
-    batch_size = audio_data.shape[0]
+    generator_batch_size = audio_data.shape[0]
+    if batch_size is None:
+        batch_size = generator_batch_size
 
-    if batch_size > n_total:
-        raise ValueError(f"The value of 'n_total' ({n_total}) is less than the batch size ({batch_size})."
+    if generator_batch_size > n_total:
+        raise ValueError(f"The value of 'n_total' ({n_total}) is less than the batch size ({generator_batch_size})."
                          " Please increase 'n_total' to be >= batch size.")
 
-    features = F.embed_clips(audio_data, batch_size=batch_size)
-    fp[row_counter:row_counter+features.shape[0], :, :] = features
-    row_counter += features.shape[0]
-    fp.flush()
+    # Compute features and add data to output file, prefetching the next batch of audio data
+    # from the generator (e.g., augmenting clips) while the features are computed
+    with ThreadPool(processes=1) as prefetch_pool, \
+            tqdm(total=int(np.ceil(n_total/generator_batch_size)), desc="Computing features") as pbar:
+        while audio_data is not None and row_counter < n_total:
+            next_audio_data = prefetch_pool.apply_async(next, (generator, None))
 
-    # Compute features and add data to output file
-    for audio_data in tqdm(generator, total=n_total//batch_size, desc="Computing features"):
-        if row_counter >= n_total:
-            break
+            features = F.embed_clips(audio_data, batch_size=batch_size, ncpu=ncpu)
+            if row_counter + features.shape[0] > n_total:
+                features = features[0:n_total-row_counter]
 
-        features = F.embed_clips(audio_data, batch_size=batch_size, ncpu=ncpu)
-        if row_counter + features.shape[0] > n_total:
-            features = features[0:n_total-row_counter]
+            fp[row_counter:row_counter+features.shape[0], :, :] = features
+            row_counter += features.shape[0]
+            fp.flush()
+            pbar.update()
 
-        fp[row_counter:row_counter+features.shape[0], :, :] = features
-        row_counter += features.shape[0]
-        fp.flush()
+            audio_data = next_audio_data.get()
 
     # Trip empty rows from the mmapped array
     trim_mmap(output_file)
@@ -594,6 +743,8 @@ def compute_features_from_generator(generator, n_total, clip_duration, output_fi
 # Function to download files from a URL with a progress bar
 def download_file(url, target_directory, file_size=None):
     """A simple function to download a file from a URL with a progress bar using only the requests library"""
+    import requests  # only needed for downloads, and slow to import
+
     local_filename = url.split('/')[-1]
 
     with requests.get(url, stream=True) as r:
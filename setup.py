@@ -46,7 +46,8 @@ setuptools.setup(
                     'types-PyYAML',
                     'mock>=5.1,<6',
                     'types-mock>=5.1,<6',
-                    'types-requests>=2.0,<3'
+                    'types-requests>=2.0,<3',
+                    'onnx>=1.14.0,<2'
                 ],
         'full': [
                     'mutagen>=1.46.0,<2',
@@ -0,0 +1,70 @@
+# Copyright 2022 David Scripka. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+# Imports
+import os
+import numpy as np
+import tempfile
+import pytest
+
+# The data module requires the (optional) training dependencies
+data = pytest.importorskip("openwakeword.data", reason="requires the training dependencies (openwakeword[full])")
+
+
+# Helper function to make mmaped feature files where each value identifies the example it belongs to
+def make_feature_files(tmp_dir):
+    positive = np.repeat(np.arange(20, dtype=np.float32), 32*4).reshape(20, 32, 4)
+    negative = np.repeat(np.arange(100, 140, dtype=np.float32), 16*4).reshape(40, 16, 4)
+    np.save(os.path.join(tmp_dir, "positive.npy"), positive)
+    np.save(os.path.join(tmp_dir, "negative.npy"), negative)
+    return {"1": os.path.join(tmp_dir, "positive.npy"), "0": os.path.join(tmp_dir, "negative.npy")}, positive, negative
+
+
+# Tests
+class TestMmapBatchGenerator:
+    def test_split_frames(self):
+        # Examples with more frames than `n_frames` should be split into consecutive windows across the batch
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            data_files, positive, negative = make_feature_files(tmp_dir)
+            batch_generator = data.mmap_batch_generator(data_files, n_per_class={"1": 2, "0": 4}, n_frames=16)
+
+            X, y = next(batch_generator)
+            # 2 positive examples of 32 frames are 4 windows of 16 frames, but the final window is dropped
+            assert X.shape == (3 + 4, 16, 4)
+            assert np.array_equal(X[0:3], positive[0:2].reshape(-1, 4)[0:48].reshape(3, 16, 4))
+            assert np.array_equal(X[3:], negative[0:4])
+            assert list(y) == ["1"]*3 + ["0"]*4
+
+    def test_automatic_n_per_class(self):
+        # The number of examples per class should follow the size of each class, including the effect of `n_frames`
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            data_files, _, _ = make_feature_files(tmp_dir)
+            batch_generator = data.mmap_batch_generator(data_files, batch_size=12, n_frames=16)
+
+            # 12*20/60 = 4 positive windows (from 2 examples), and 12*40/60 = 8 negative examples
+            assert batch_generator.n_per_class == {"1": 2, "0": 8}
+
+    def test_shards_do_not_overlap(self):
+        # Generators for different shards should produce different examples, covering all of the data together
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            data_files, _, _ = make_feature_files(tmp_dir)
+            examples = []
+            for shard_id in range(2):
+                batch_generator = data.mmap_batch_generator(data_files, n_per_class={"1": 2, "0": 4}, n_frames=16)
+                batch_generator.set_shard(shard_id, 2)
+                examples.append(set(np.concatenate([next(batch_generator)[0][:, 0, 0] for _ in range(5)])))
+
+            assert examples[0].isdisjoint(examples[1])
+            assert examples[0] | examples[1] == set(range(20)) | set(range(100, 140))
@@ -37,7 +37,9 @@ import collections
 import pytest
 import platform
 import pickle
+import wave
 import tempfile
+import shutil
 import mock
 
 # Download models needed for tests
@@ -93,6 +95,95 @@ class TestModels:
         predictions2 = owwModel2.predict_clip(os.path.join("tests", "data", "alexa_test.wav"), chunk_size=1024*2)
         assert abs(max([i['1_minute_timer'] for i in predictions1]) - max([i['1_minute_timer'] for i in predictions2])) < 0.00001
 
+    def test_predict_with_fused_models(self):
+        # Load the same models with and without merging them into a single ONNX graph
+        # (with a fixed seed, as the feature buffer is initialized with random data)
+        np.random.seed(0)
+        owwModel1 = openwakeword.Model(wakeword_models=["alexa", "hey mycroft", "timer"], inference_framework="onnx")
+        np.random.seed(0)
+        owwModel2 = openwakeword.Model(wakeword_models=["alexa", "hey mycroft", "timer"], inference_framework="onnx",
+                                       fuse_models=True)
+
+        # Predictions should match for frame sizes both equal to and larger than the standard chunk size (1280 samples)
+        for chunk_size in [1280, 1280*2]:
+            predictions1 = owwModel1.predict_clip(os.path.join("tests", "data", "alexa_test.wav"), chunk_size=chunk_size)
+            predictions2 = owwModel2.predict_clip(os.path.join("tests", "data", "alexa_test.wav"), chunk_size=chunk_size)
+            for i, j in zip(predictions1, predictions2):
+                for key in i.keys():
+                    assert abs(i[key] - j[key]) < 0.00001
+
+    def test_predict_with_quantized_models(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            # Copy model to temporary directory, so that the quantized model is saved there
+            model_path = os.path.join(tmp_dir, "alexa_v0.1.onnx")
+            shutil.copy(os.path.join("openwakeword", "resources", "models", "alexa_v0.1.onnx"), model_path)
+
+            np.random.seed(0)
+            owwModel1 = openwakeword.Model(wakeword_models=[model_path], inference_framework="onnx")
+            np.random.seed(0)
+            owwModel2 = openwakeword.Model(wakeword_models=[model_path], inference_framework="onnx", quantize_models=True)
+            assert os.path.exists(os.path.join(tmp_dir, "alexa_v0.1.int8.onnx"))
+
+            # Scores from the quantized model should be close to those of the original model
+            predictions1 = owwModel1.predict_clip(os.path.join("tests", "data", "alexa_test.wav"))
+            predictions2 = owwModel2.predict_clip(os.path.join("tests", "data", "alexa_test.wav"))
+            assert abs(max([i['alexa_v0.1'] for i in predictions1]) - max([i['alexa_v0.1'] for i in predictions2])) < 0.05
+
+    def test_predict_with_parallel_models(self):
+        # Predictions from models run concurrently should match those from models run sequentially
+        np.random.seed(0)
+        owwModel1 = openwakeword.Model(wakeword_models=["alexa", "hey mycroft", "timer"], inference_framework="onnx")
+        np.random.seed(0)
+        owwModel2 = openwakeword.Model(wakeword_models=["alexa", "hey mycroft", "timer"], inference_framework="onnx",
+                                       parallel=True)
+
+        for chunk_size in [1280, 1280*2]:
+            predictions1 = owwModel1.predict_clip(os.path.join("tests", "data", "alexa_test.wav"), chunk_size=chunk_size,
+                                                  batch_size=1)
+            predictions2 = owwModel2.predict_clip(os.path.join("tests", "data", "alexa_test.wav"), chunk_size=chunk_size,
+                                                  batch_size=1)
+            for i, j in zip(predictions1, predictions2):
+                assert i == j
+
+        # Closing the model should shut down its thread pool, and the models should then run sequentially
+        pool = owwModel2._pool
+        owwModel2.close()
+        assert owwModel2._pool is None and pool._shutdown
+        owwModel2.predict(np.zeros(1280*2, dtype=np.int16))
+
+    def test_predict_clip_with_batches(self):
+        # Predictions on batches of frames should match predictions on each frame
+        # (including when `timing` is explicitly disabled, which doesn't prevent batching,
+        # and with a patience longer than the prediction buffer, using a longer clip)
+        with wave.open(os.path.join("tests", "data", "alexa_test.wav"), mode='rb') as f:
+            clip = np.tile(np.frombuffer(f.readframes(f.getnframes()), dtype=np.int16), 3)
+        for kwargs in [{}, {"patience": {"alexa": 2, "timer": 3}, "threshold": {"alexa": 0.1, "timer": 0.1}},
+                       {"patience": {"alexa": 40}, "threshold": {"alexa": 0.0}}, {"timing": False}]:
+            np.random.seed(0)
+            owwModel1 = openwakeword.Model(wakeword_models=["alexa", "timer"], inference_framework="onnx")
+            np.random.seed(0)
+            owwModel2 = openwakeword.Model(wakeword_models=["alexa", "timer"], inference_framework="onnx")
+
+            predictions1 = owwModel1.predict_clip(clip, batch_size=1, **kwargs)
+            predictions2 = owwModel2.predict_clip(clip, batch_size=32, **kwargs)
+            assert len(predictions1) == len(predictions2)
+            for i, j in zip(predictions1, predictions2):
+                for key in i.keys():
+                    assert abs(i[key] - j[key]) < 0.00001
+
+    def test_pickle_model(self):
+        # An unpickled model should be re-created with the same models and make the same predictions
+        np.random.seed(0)
+        owwModel1 = openwakeword.Model(wakeword_models=["alexa", "timer"], inference_framework="onnx")
+        np.random.seed(0)
+        owwModel2 = pickle.loads(pickle.dumps(owwModel1))
+        assert list(owwModel1.models.keys()) == list(owwModel2.models.keys())
+
+        predictions1 = owwModel1.predict_clip(os.path.join("tests", "data", "alexa_test.wav"))
+        predictions2 = owwModel2.predict_clip(os.path.join("tests", "data", "alexa_test.wav"))
+        for i, j in zip(predictions1, predictions2):
+            assert i == j
+
     def test_exception_handling_for_inference_framework(self):
         with mock.patch.dict(sys.modules, {'onnxruntime': None}):
             with pytest.raises(ValueError):
@@ -267,6 +358,24 @@ class TestModels:
             threshold={target_model_name: 0.5}
             )
 
+    def test_prediction_buffer(self):
+        # The prediction buffer should behave the same as a deque with a maximum length
+        buffer = openwakeword.model.PredictionBuffer(maxlen=5)
+        reference = collections.deque(maxlen=5)
+        for i in range(12):
+            buffer.append(i)
+            reference.append(i)
+            assert list(buffer) == list(reference)
+            assert len(buffer) == len(reference)
+            assert buffer[-1] == reference[-1] and buffer[0] == reference[0]
+            assert list(buffer.last(3)) == list(reference)[-3:]
+
+    def test_compute_embedding_shape(self):
+        # The embedding shape computed without the feature models should match the shape from the models
+        F = openwakeword.utils.AudioFeatures(inference_framework="onnx")
+        for audio_length in [1, 2, 3, 4.5]:
+            assert openwakeword.utils.compute_embedding_shape(audio_length) == F.get_embedding_shape(audio_length)
+
     def test_get_parent_model_from_prediction_label(self):
         owwModel = openwakeword.Model()
         target_model_name = list(owwModel.models.keys())[0]